@@ -0,0 +1,38 @@
+import re
+import timeit
+from rfa_utils.chart_parser import parse_chart
+from benchmarks.synthetic import chart_page
+
+
+def legacy_parse(html: str, start_date: str, end_date: str) -> list:
+    """Three-search implementation of scrape_source and extract_vals kept for comparison"""
+    start = re.search(rf'\[new Date\("{start_date}"\)', html, re.DOTALL)
+    end = re.search(rf'\[new Date\("{end_date}"\)[^\]]*', html, re.DOTALL)
+    try:
+        graph_data = html[start.start():end.end() + 1]
+    except AttributeError:
+        end_str = re.findall(r'\[new Date\("[\d/]*"\)[^\]]*\]', html, re.DOTALL)[-1]
+        end = re.search(re.escape(end_str), html, re.DOTALL)
+        graph_data = html[start.start():end.end() + 1]
+    return [float(m[1]) for m in re.findall(r'new Date\("(.+?)"\),([\d.]+)', graph_data)]
+
+
+def run(days: int = 100_000, repeat: int = 5) -> dict:
+    """Time the legacy and single-pass parsers on a multi-MB page, as str and bytes"""
+    html = chart_page(days)
+    raw = html.encode()
+    start, end = '2010/01/01', '9999/12/31'  # Missing end date takes the legacy fallback path
+    legacy = min(timeit.repeat(lambda: legacy_parse(html, start, end), number=1, repeat=repeat))
+    parsed = min(timeit.repeat(lambda: parse_chart(html, start, end), number=1, repeat=repeat))
+    parsed_bytes = min(timeit.repeat(lambda: parse_chart(raw, start, end), number=1, repeat=repeat))
+    return {
+        'page_mb': len(raw) / 1e6,
+        'legacy_s': legacy,
+        'parse_chart_s': parsed,
+        'parse_chart_bytes_s': parsed_bytes,
+        'speedup': legacy / parsed
+    }
+
+
+if __name__ == '__main__':
+    print(run())
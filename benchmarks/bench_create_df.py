@@ -0,0 +1,31 @@
+import timeit
+import polars as pl
+from datetime import datetime
+from rfa_utils import coingecko_api as ca
+from benchmarks.synthetic import market_chart_json
+
+
+def legacy_json_to_df(json: dict) -> pl.DataFrame:
+    """Per-row implementation of create_df kept for comparison"""
+    data = {'timestamps': [x[0] for x in json['prices']]}
+    for key, value in json.items():
+        data[key] = [x[1] for x in value]
+    df = pl.DataFrame(data)
+    date_series = df['timestamps'].apply(lambda x: datetime.fromtimestamp(x/1000).date())
+    df = df.with_columns([date_series.alias('date')]).drop('timestamps')
+    df = df.select(['date', *df.columns[:-1]])
+    for column in df.columns[1:]:
+        df = df.with_columns(df[column].apply(lambda x: None if x == 0 else x).alias(column))
+    return df
+
+
+def run(points: int = 1_000_000, repeat: int = 3) -> dict:
+    """Time the legacy and vectorized JSON to dataframe paths"""
+    json = market_chart_json(points)
+    legacy = min(timeit.repeat(lambda: legacy_json_to_df(json), number=1, repeat=repeat))
+    vectorized = min(timeit.repeat(lambda: ca.json_to_df(json, '2019/01/01'), number=1, repeat=repeat))
+    return {'points': points, 'legacy_s': legacy, 'vectorized_s': vectorized, 'speedup': legacy / vectorized}
+
+
+if __name__ == '__main__':
+    print(run())
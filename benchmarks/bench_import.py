@@ -0,0 +1,52 @@
+import sys
+import subprocess
+
+# Import time budget in ms for each module, including everything it imports
+BUDGETS = {
+    'rfa': 50,
+    'rfa.__main__': 600,
+    'rfa_utils.general_fns': 500,
+    'rfa_utils.cache': 500,
+    'rfa_utils.coingecko_api': 700,
+    'rfa_utils.owlracle_api': 700,
+    'rfa_utils.crypto_scrape': 700,
+    'rfa_utils.clean_crypto': 500,
+    'rfa_utils.remittance_cube': 500,
+    'rfa_utils.wb_ingest': 500,
+    'rfa_ana.analysis': 1200,
+    'rfa_ana.simulation': 1200
+}
+# Heavy dependencies that must only load on first use
+LAZY = ['miceforest', 'lightgbm', 'scipy', 'selenium', 'dotenv', 'xlsxwriter', 'xlrd', 'seaborn', 'matplotlib.pyplot']
+
+
+def import_time(module: str) -> tuple:
+    """Import a module in a fresh interpreter, return its cumulative import time in ms and the lazy modules it loaded"""
+    code = f'import sys, {module}; print(",".join(m for m in {LAZY!r} if m in sys.modules))'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+    # Lines look like "import time:       self [us] |  cumulative | imported package"
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    loaded = [m for m in proc.stdout.strip().split(',') if m]
+    return cumulative / 1000, loaded
+
+
+def run(repeat: int = 3) -> dict:
+    """Check every module against its budget, keeping the fastest of a few imports"""
+    results = {}
+    for module, budget in BUDGETS.items():
+        timings = [import_time(module) for _ in range(repeat)]
+        ms = min(ms for ms, _ in timings)
+        results[module] = {'ms': ms, 'budget_ms': budget, 'loaded': timings[0][1], 'ok': ms <= budget and not timings[0][1]}
+    return results
+
+
+if __name__ == '__main__':
+    results = run()
+    for module, result in results.items():
+        loaded = f"  loaded {', '.join(result['loaded'])}" if result['loaded'] else ''
+        print(f"{module:28s} {result['ms']:8.1f} ms / {result['budget_ms']:5d} ms  {'ok' if result['ok'] else 'FAIL'}{loaded}")
+    sys.exit(0 if all(r['ok'] for r in results.values()) else 1)
@@ -0,0 +1,32 @@
+import timeit
+import polars as pl
+from scipy.stats.mstats import winsorize
+from rfa_utils import clean_crypto as cc
+from benchmarks.synthetic import messari_df
+
+
+def legacy_winsorize_df(df: pl.DataFrame, limits: tuple = (0.05, 0.05)) -> pl.DataFrame:
+    """Column by column scipy implementation kept for comparison"""
+    for col in df.columns[1:]:
+        win_values = winsorize(df[col].to_numpy(), limits=limits)
+        df = df.drop(col)
+        df = df.with_columns(**{col: pl.Series(name=col, values=win_values)})
+    return df
+
+
+def check(df: pl.DataFrame, limits: tuple = (0.05, 0.05)) -> bool:
+    """Check the native winsorization against scipy, treating NaN and null as equal"""
+    expected = legacy_winsorize_df(df, limits).fill_nan(None)
+    return cc.winsorize_df(df, limits).frame_equal(expected, null_equal=True)
+
+
+def run(rows: int = 1_000_000, repeat: int = 3) -> dict:
+    """Time the scipy and native winsorization"""
+    df = messari_df(rows)
+    legacy = min(timeit.repeat(lambda: legacy_winsorize_df(df), number=1, repeat=repeat))
+    native = min(timeit.repeat(lambda: cc.winsorize_df(df), number=1, repeat=repeat))
+    return {'rows': rows, 'matches_scipy': check(df), 'legacy_s': legacy, 'native_s': native, 'speedup': legacy / native}
+
+
+if __name__ == '__main__':
+    print(run())
@@ -0,0 +1,15 @@
+from benchmarks.suite import SIZES, suite
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('rfa benchmarks')
+    for name, default in SIZES.items():
+        group.addoption(f'--bench-{name}', type=int, default=default, help=f'synthetic {name} for the hot path benchmarks')
+
+
+def pytest_generate_tests(metafunc):
+    # The synthetic data is only generated when a benchmark asks for a case
+    if 'case' in metafunc.fixturenames:
+        sizes = {name: metafunc.config.getoption(f'--bench-{name}', default) for name, default in SIZES.items()}
+        cases = suite(**sizes)
+        metafunc.parametrize('case', [(*case, sizes) for case in cases.values()], ids=list(cases))
@@ -0,0 +1,59 @@
+from datetime import timedelta
+from benchmarks import synthetic as syn
+
+# Default sizes, overridden with the --bench-days, --bench-symbols and --bench-countries pytest options
+SIZES = {'days': 1461, 'symbols': 10, 'countries': 250}
+CRYPTO_SYMS = ['btc', 'xrp', 'doge', 'ltc', 'xmr', 'bch', 'xlm', 'bsv', 'zec', 'dash']
+
+
+def suite(days: int, symbols: int, countries: int) -> dict:
+    """Return the benchmark cases as name -> (function to time, rows processed)"""
+    from rfa_utils import coingecko_api as ca
+    from rfa_utils import owlracle_api as oa
+    from rfa_utils import clean_crypto as cc
+    from rfa_utils import crypto_scrape as cs
+    from rfa_utils import remittance_cube as rc
+    from rfa_utils.chart_parser import parse_chart
+    from rfa_eda import remittance_eda as reda
+    from rfa_ana import analysis as ana
+    from rfa_ana import simulation as sim
+
+    syms = (CRYPTO_SYMS * (symbols // len(CRYPTO_SYMS) + 1))[:symbols]
+    syms = [f'{s}{i}' if i >= len(CRYPTO_SYMS) else s for i, s in enumerate(syms)]
+    end = (syn.START + timedelta(days=days - 1)).strftime('%Y/%m/%d')
+    start = syn.START.strftime('%Y/%m/%d')
+    chart_json = syn.market_chart_json(days)
+    candles_json = syn.owlracle_json(days)
+    messari = syn.messari_df(days)
+    gas_fees = syn.gas_fees_df(days)
+    page = syn.chart_page(days)
+    api = syn.api_dict(days, syms)
+    scraped = syn.scraped_dict(days, syms)
+    sheets = syn.remittance_sheets(countries)
+    cube = {'facts': rc.build_facts(sheets)}
+    cube['aggregates'] = rc.build_aggregates(cube['facts'])
+    cost_to = sheets['cost-to-country'].to_pandas()
+    lookup = sheets['country-lookup'].to_pandas()
+    panel = syn.pandas_panel(days, syms)
+    scenarios = ana.crypto_fees_scenarios(panel)
+    cost_table = rc.cube_pivot(cube, 'cost_to', 'Region')
+    methods = sim.cost_methods(panel, gas_fees, cube)
+    sim_years = sorted({int(y) for y in panel[syms[0]].index.year})
+    stat_points = {stat: parse_chart(page, start, end) for stat in ['a', 'b', 'c']}
+    return {
+        'coingecko.extract_json': (lambda: ca.extract_json(chart_json), days),
+        'coingecko.create_df': (lambda: ca.json_to_df(chart_json, start), days),
+        'owlracle.extract_json': (lambda: oa.extract_json(candles_json), days),
+        'crypto_scrape.parse_chart': (lambda: parse_chart(page, start, end), days),
+        'crypto_scrape.create_dataframe': (lambda: cs.create_dataframe(stat_points, start, end), days * 3),
+        'clean_crypto.winsorize_df': (lambda: cc.winsorize_df(messari), days),
+        'clean_crypto.merge_api_scraped': (lambda: cc.merge_api_scraped(api, dict(scraped), syms), days * symbols),
+        'clean_crypto.impute_dfs': (lambda: cc.impute_dfs({s: api[s] for s in syms[:2]}), days * 2),
+        'remittance_eda.pivot_table': (lambda: reda.pivot_table(reda.merge_lookup(cost_to, lookup), 'Region'), countries),
+        'remittance_cube.cube_pivot': (lambda: rc.cube_pivot(cube, 'cost_to', 'Region', weighted=True), countries),
+        'analysis.crypto_fees_scenarios': (lambda: ana.crypto_fees_scenarios(panel, stats=('mean', 'median', 'p90')), days * symbols),
+        'analysis.combine_average_case': (lambda: ana.combine_average_case(scenarios), len(scenarios)),
+        'analysis.stablecoin_fees_scenarios': (lambda: ana.stablecoin_fees_scenarios(gas_fees, (50, 200, 1000)), days),
+        'analysis.predict_remittance_cost': (lambda: ana.predict_remittance_cost(cost_table, intervals=True), countries),
+        'simulation.simulate_costs': (lambda: sim.simulate_costs(methods, sim_years, draws=100_000), 100_000 * len(sim_years))
+    }
@@ -0,0 +1,145 @@
+import numpy as np
+import polars as pl
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+
+START = date(2019, 1, 1)
+
+
+def market_chart_json(points: int, seed: int = 0) -> dict:
+    """Create a synthetic CoinGecko market_chart JSON with one point per day"""
+    rng = np.random.default_rng(seed)
+    start = int(datetime(2019, 1, 1, tzinfo=timezone.utc).timestamp()) * 1000
+    stamps = start + np.arange(points, dtype=np.int64) * 86_400_000
+    json = {}
+    for key in ['prices', 'market_caps', 'total_volumes']:
+        values = rng.lognormal(size=points)
+        values[rng.random(points) < 0.01] = 0  # Sprinkle zeros to be nulled
+        json[key] = [[int(t), float(v)] for t, v in zip(stamps, values)]
+    return json
+
+
+def owlracle_json(days: int, seed: int = 0) -> dict:
+    """Create synthetic Owlracle history JSON with daily candles, keyed by yearly UNIX windows"""
+    rng = np.random.default_rng(seed)
+    json = {}
+    for offset in range(0, days, 365):
+        first = datetime(2019, 1, 1, tzinfo=timezone.utc) + timedelta(days=offset)
+        count = min(365, days - offset)
+        candles = []
+        for i, (fee, price) in enumerate(zip(rng.lognormal(size=count), rng.lognormal(3, size=count))):
+            stamp = (first + timedelta(days=i)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            candles.append({'timestamp': stamp, 'txFee': {'close': float(fee)}, 'gasPrice': {'close': float(price)}})
+        window = (int(first.timestamp()), int(first.timestamp()) + count * 86400)
+        json[window] = {'candles': candles}
+    return json
+
+
+def chart_page(days: int, null_share: float = 0.01, padding: int = 200_000, seed: int = 0) -> str:
+    """Create a synthetic BitInfoCharts page with one chart point per day"""
+    rng = np.random.default_rng(seed)
+    start = date(2009, 1, 3)
+    points = []
+    for i, value in enumerate(rng.lognormal(size=days)):
+        day = (start + timedelta(days=i)).strftime('%Y/%m/%d')
+        points.append(f'[new Date("{day}"),{"null" if rng.random() < null_share else f"{value:.6f}"}]')
+    markup = '<div>' + 'x' * padding + '</div>'  # Markup around the chart script
+    return f'<html><body>{markup}<div id="container"></div><script>var d = [{",".join(points)}];</script>{markup}</body></html>'
+
+
+def date_series(days: int) -> pl.Series:
+    """Return a daily date series starting on 2019/01/01"""
+    return pl.date_range(START, START + timedelta(days=days - 1), interval='1d', eager=True).alias('date')
+
+
+def stat_df(days: int, columns: list, null_share: float = 0.02, seed: int = 0) -> pl.DataFrame:
+    """Create a dataframe with a date column and lognormal stat columns with ties and missing values"""
+    rng = np.random.default_rng(seed)
+    data = {'date': date_series(days)}
+    for col in columns:
+        values = np.round(rng.lognormal(size=days), 2)  # Rounding creates ties
+        values[rng.random(days) < null_share] = np.nan
+        data[col] = values
+    return pl.DataFrame(data).fill_nan(None)
+
+
+def messari_df(rows: int, cols: int = 5, null_share: float = 0.02, seed: int = 0) -> pl.DataFrame:
+    """Create a synthetic Messari-like dataframe"""
+    return stat_df(rows, [f'stat_{i}' for i in range(cols)], null_share, seed)
+
+
+def api_dict(days: int, symbols: list, seed: int = 0) -> dict:
+    """Create CoinGecko-shaped dataframes for each symbol"""
+    return {sym: stat_df(days, ['prices', 'market_caps', 'total_volumes'], 0.01, seed + i) for i, sym in enumerate(symbols)}
+
+
+def scraped_dict(days: int, symbols: list, seed: int = 0) -> dict:
+    """Create scraped dataframes for each symbol, with the XRP/BSV BitInfoCharts and Messari sheets"""
+    cols = ['transactions_count', 'average_transaction_fees', 'average_transaction_value']
+    # XLM is always cleaned by merge_api_scraped
+    names = symbols if 'xlm' in symbols else [*symbols, 'xlm']
+    scraped = {sym: stat_df(days, cols, 0.02, seed + i) for i, sym in enumerate(names) if sym not in ('xrp', 'bsv')}
+    for i, name in enumerate(['xrp', 'bsv']):
+        scraped[f'{name}_bit'] = stat_df(days, ['transactions_count'], 0.02, seed + 100 + i)
+        scraped[f'{name}_mes'] = stat_df(days, ['total_fees', 'average_transaction_value'], 0.02, seed + 200 + i)
+    return scraped
+
+
+def pandas_panel(days: int, symbols: list, seed: int = 0) -> dict:
+    """Create imputed-like pandas dataframes indexed by date for each symbol"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(START, periods=days, freq='D', name='date')
+    dfs = {}
+    for sym in symbols:
+        df = pd.DataFrame({
+            'average_transaction_fees': rng.lognormal(size=days),
+            'average_transaction_value': rng.lognormal(5, size=days),
+            '24h_volume': rng.lognormal(15, size=days),
+            'transactions_count': rng.lognormal(10, size=days)
+        }, index=index)
+        df['fee_percentage'] = df['average_transaction_fees'] / df['average_transaction_value'] * 100
+        dfs[sym] = df
+    return dfs
+
+
+def gas_fees_df(days: int, seed: int = 0) -> pd.DataFrame:
+    """Create an Ethereum gas fees dataframe indexed by date"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(START, periods=days, freq='D', name='date')
+    return pd.DataFrame({'transaction_fees': rng.lognormal(size=days), 'gas_prices': rng.lognormal(3, size=days)}, index=index)
+
+
+def world_bank_table(countries: int, years: range = range(1970, 2023), null_share: float = 0.2, seed: int = 0) -> pl.DataFrame:
+    """Create a wide World Bank-shaped table with a Country Code column and one column per year"""
+    rng = np.random.default_rng(seed)
+    data = {'Country Code': [f'C{i:04d}' for i in range(countries)]}
+    for year in years:
+        values = rng.lognormal(18, size=countries)
+        values[rng.random(countries) < null_share] = np.nan
+        data[str(year)] = values
+    return pl.DataFrame(data).fill_nan(None)
+
+
+def country_lookup(countries: int, seed: int = 0) -> pl.DataFrame:
+    """Create a country lookup with income and region groups"""
+    rng = np.random.default_rng(seed)
+    incomes = ['High income', 'Upper middle income', 'Lower middle income', 'Low income']
+    regions = ['East Asia & Pacific', 'Europe & Central Asia', 'Latin America & Caribbean',
+               'Middle East & North Africa', 'North America', 'South Asia', 'Sub-Saharan Africa']
+    return pl.DataFrame({
+        'Country Code': [f'C{i:04d}' for i in range(countries)],
+        'Country Name': [f'Country {i}' for i in range(countries)],
+        'Region': rng.choice(regions, countries),
+        'Income': rng.choice(incomes, countries)
+    })
+
+
+def remittance_sheets(countries: int, seed: int = 0) -> dict:
+    """Create the sheets of remittance-data.xlsx used by the remittance EDA and cube"""
+    return {
+        'country-lookup': country_lookup(countries, seed),
+        'cost-to-country': world_bank_table(countries, range(2011, 2021), 0.3, seed + 1),
+        'cost-from-country': world_bank_table(countries, range(2011, 2021), 0.5, seed + 2),
+        'inflows': world_bank_table(countries, range(1970, 2023), 0.2, seed + 3),
+        'outflows': world_bank_table(countries, range(1970, 2023), 0.2, seed + 4)
+    }
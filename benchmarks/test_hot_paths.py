@@ -0,0 +1,5 @@
+def test_hot_path(benchmark, case):
+    fn, rows, sizes = case
+    benchmark.extra_info.update(rows=rows, **sizes)
+    benchmark(fn)
+    benchmark.extra_info['rows_per_s'] = rows / benchmark.stats.stats.min
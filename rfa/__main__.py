@@ -0,0 +1,41 @@
+import argparse
+from rfa import dag
+from rfa.stages import STAGES
+
+
+def parse_names(value: str) -> set:
+    """Parse a comma separated list of stage names"""
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown stages {sorted(unknown)}, choose from {list(STAGES)}")
+    return names
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m rfa', description='Run the remittance fees analysis pipeline')
+    parser.add_argument('--only', type=parse_names, help='only build these comma separated stages')
+    parser.add_argument('--from', dest='start', type=parse_names, help='rebuild these stages and everything downstream')
+    parser.add_argument('--force', action='store_true', help='rebuild every selected stage')
+    parser.add_argument('--update', action='store_true', help='only fetch the rows missing from stored API data')
+    parser.add_argument('--dry-run', action='store_true', help='print the stages that would rebuild and exit')
+    parser.add_argument('--workers', type=int, default=4, help='number of stages to run concurrently')
+    parser.add_argument('--metrics', help='append per-call timing, memory and row counts as JSON lines to this file')
+    parser.add_argument('--profile', help='write a cProfile dump of every instrumented call to this directory')
+    args = parser.parse_args(argv)
+
+    order = dag.plan(STAGES, args.only, args.start, args.force)
+    if args.dry_run:
+        for name in order:
+            stage = STAGES[name]
+            deps = f" (after {', '.join(stage.deps)})" if stage.deps else ''
+            print(f'{name} -> {stage.output}{deps}')
+        return
+    if args.metrics or args.profile:
+        from rfa_utils.instrument import instrument_package
+        instrument_package(stages=STAGES, log_path=args.metrics, profile_dir=args.profile, trace_memory=True)
+    dag.run(STAGES, order, args.workers, update=args.update)
+
+
+if __name__ == '__main__':
+    main()
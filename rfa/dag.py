@@ -0,0 +1,111 @@
+import os
+from typing import Callable, NamedTuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from rfa_utils import cache
+from rfa_utils import general_fns as gf
+
+
+class Stage(NamedTuple):
+    """A pipeline stage that builds its output dataset from the outputs of its dependencies"""
+    name: str
+    build: Callable
+    output: str
+    deps: tuple = ()
+    # Appends the missing rows to the stored output in place of build when running incrementally
+    update: Callable = None
+
+
+def stage_key(stage: Stage) -> str:
+    """Return the key of a stage's build function with the parameters it declares as defaults"""
+    return cache.stage_key(stage.build, (), {})
+
+
+def output_time(stage: Stage) -> float:
+    """Return the modification time of a stage's data store, or of the legacy Excel file, 0 if missing"""
+    path = gf.store_path(stage.output)
+    if os.path.isdir(path):
+        # Rewriting a sheet does not touch the folder, so the newest file counts
+        return max([os.path.getmtime(path)] + [entry.stat().st_mtime for entry in os.scandir(path)])
+    if os.path.exists(stage.output):
+        return os.path.getmtime(stage.output)
+    return 0
+
+
+def downstream(stages: dict, names: set) -> set:
+    """Return the given stages and every stage that depends on them"""
+    result = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for stage in stages.values():
+            if stage.name not in result and result.intersection(stage.deps):
+                result.add(stage.name)
+                changed = True
+    return result
+
+
+def plan(stages: dict, only: set = None, start: set = None, force: bool = False) -> list:
+    """Return the stages to rebuild in dependency order.
+    A stage rebuilds when its output is missing, was built with other parameters, is older than a dependency's
+    output, or a dependency rebuilds.
+    only restricts the run to the given stages, start forces the given stages and everything downstream"""
+    forced = downstream(stages, start) if start else set()
+    order = []
+    rebuild = set()
+    visited = set()
+
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        visited.add(name)
+        stage = stages[name]
+        for dep in stage.deps:
+            visit(dep)
+        built = output_time(stage)
+        stale = (
+            force or name in forced or built == 0 or not cache.is_current(stage.output, stage_key(stage))
+            or any(dep in rebuild or output_time(stages[dep]) > built for dep in stage.deps)
+        )
+        if stale and (only is None or name in only):
+            rebuild.add(name)
+            order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def run(stages: dict, order: list, workers: int = 4, log: Callable = print, update: bool = False) -> None:
+    """Build the planned stages, running independent branches concurrently, incrementally if update is set"""
+    pending = set(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            # Submit every stage whose planned dependencies are done
+            for name in [n for n in order if n in pending]:
+                if not any(dep in pending or dep in running.values() for dep in stages[name].deps):
+                    pending.remove(name)
+                    log(f'>>> {name}')
+                    running[executor.submit(build_stage, stages[name], update)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                # Raise the first failure, the executor waits for running stages on exit
+                future.result()
+                log(f'<<< {name}')
+
+
+def build_stage(stage: Stage, update: bool = False) -> None:
+    """Build a stage and write its output to the data store.
+    With update, stages that can update only fetch the rows missing from their stored output"""
+    if update and stage.update is not None:
+        gf.check_and_update(stage.output, stage.build, stage.update)
+        data = None
+    else:
+        data = stage.build()
+    # Streaming stages write their own output and return None
+    if data is not None:
+        gf.create_store(stage.output, data)
+    # Record the parameters the output was built with
+    if gf.store_exists(stage.output):
+        cache.write_key(stage.output, stage_key(stage))
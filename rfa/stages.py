@@ -0,0 +1,231 @@
+import os
+from rfa.dag import Stage
+from rfa_utils import cache
+from rfa_utils import general_fns as gf
+
+START = '2019/01/01'
+END = '2022/12/31'
+CURRENCY = 'usd'
+
+CRYPTO_SYMS = ['btc', 'xrp', 'doge', 'ltc', 'xmr', 'bch', 'xlm', 'bsv', 'zec', 'dash']
+CRYPTO_IDS = ['bitcoin', 'ripple', 'dogecoin', 'litecoin', 'monero', 'bitcoin-cash', 'stellar', 'bitcoin-cash-sv', 'zcash', 'dash']
+STABLECOIN_SYMS = ['usdt', 'usdc', 'busd', 'dai', 'tusd', 'usdp', 'gusd']
+STABLECOIN_IDS = ['tether', 'usd-coin', 'binance-usd', 'dai', 'true-usd', 'paxos-standard', 'gemini-dollar']
+SCRAPED_SHEETS = ['btc', 'xrp_bit', 'xrp_mes', 'doge', 'ltc', 'xmr', 'bsv_bit', 'bsv_mes', 'bch', 'xlm', 'zec', 'dash']
+# Dict of token stats list for scraping
+TOKEN_STATS = {
+    'btc': ['bitcoin-transactions', 'bitcoin-transactionvalue', 'bitcoin-mediantransactionvalue', 'bitcoin-transactionfees', 'bitcoin-median_transaction_fee'],
+    'xrp': ['xrp-transactions', 'transactionfees-xrp'],
+    'doge': ['dogecoin-transactions', 'dogecoin-transactionvalue', 'dogecoin-mediantransactionvalue', 'dogecoin-transactionfees', 'dogecoin-median_transaction_fee'],
+    'ltc': ['litecoin-transactions', 'litecoin-transactionvalue', 'litecoin-mediantransactionvalue', 'litecoin-transactionfees', 'litecoin-median_transaction_fee'],
+    'xmr': ['monero-transactions', 'monero-transactionfees'],
+    'bsv': ['transactions-bsv'],
+    'bch': ['bitcoin%20cash-transactions', 'bitcoin%20cash-transactionvalue', 'bitcoin%20cash-mediantransactionvalue', 'bitcoin%20cash-transactionfees', 'bitcoin%20cash-median_transaction_fee'],
+    'zec': ['zcash-transactions', 'zcash-transactionfees', 'transactionvalue-zec', 'mediantransactionvalue-zec'],
+    'dash': ['dash-transactions', 'dash-transactionfees', 'dash-median_transaction_fee', 'transactionvalue-dash', 'mediantransactionvalue-dash']
+}
+
+CRYPTO_DIR = os.path.join('data', 'crypto')
+STABLECOIN_DIR = os.path.join('data', 'stablecoin')
+REMITTANCE_DIR = os.path.join('data', 'remittance')
+ANALYSIS_DIR = os.path.join('data', 'analysis')
+REPORT_DIR = 'reports'
+
+
+def import_filled(filled: str, fetched: str, names: list) -> dict:
+    """Import the manually filled dataset if there is one, else the fetched dataset"""
+    if gf.store_exists(filled) or os.path.exists(filled):
+        return gf.import_data(filled, names)
+    return gf.import_data(fetched, names)
+
+
+def crypto_api(symbols: list = CRYPTO_SYMS, ids: list = CRYPTO_IDS, currency: str = CURRENCY, start: str = START,
+               end: str = END) -> dict:
+    from rfa_utils import coingecko_api as ca
+    return cache.stage(ca.create_api_dict, ignore=('workers',))(symbols, ids, currency, start, end)
+
+
+def crypto_api_update(data: dict, symbols: list = CRYPTO_SYMS, ids: list = CRYPTO_IDS, currency: str = CURRENCY,
+                      start: str = START, end: str = END) -> dict:
+    from rfa_utils import coingecko_api as ca
+    return ca.update_api_dict(data, symbols, ids, currency, start, end)
+
+
+def crypto_scraped(token_stats: dict = TOKEN_STATS, start: str = START, end: str = END) -> dict:
+    from rfa_utils import crypto_scrape as cs
+    return cache.stage(cs.create_scrape_dict_pool, ignore=('workers',))(token_stats, start, end)
+
+
+def crypto_combined(names: list = CRYPTO_SYMS, limits: tuple = (0.05, 0.05)) -> dict:
+    from rfa_utils import clean_crypto as cc
+    api = import_filled(os.path.join(CRYPTO_DIR, 'filled-api-data.xlsx'), os.path.join(CRYPTO_DIR, 'api-data.xlsx'), names)
+    scraped = import_filled(os.path.join(CRYPTO_DIR, 'filled-scraped-data.xlsx'), os.path.join(CRYPTO_DIR, 'scraped-data.xlsx'), SCRAPED_SHEETS)
+    return cache.stage(cc.merge_api_scraped)(api, scraped, names, limits=limits)
+
+
+def crypto_imputed(names: list = CRYPTO_SYMS, datasets: int = 3, iterations: int = 3, random_state: int = 123) -> dict:
+    from rfa_utils import clean_crypto as cc
+    combined = gf.import_data(os.path.join(CRYPTO_DIR, 'combined-data.xlsx'), names)
+    impute = cache.stage(cc.impute_dfs, ignore=('workers',))
+    return impute(combined, workers=os.cpu_count(), datasets=datasets, iterations=iterations, random_state=random_state)
+
+
+def stablecoin_api(symbols: list = STABLECOIN_SYMS, ids: list = STABLECOIN_IDS, currency: str = CURRENCY,
+                   start: str = START, end: str = END) -> dict:
+    from rfa_utils import coingecko_api as ca
+    return cache.stage(ca.create_api_dict, ignore=('workers',))(symbols, ids, currency, start, end)
+
+
+def stablecoin_api_update(data: dict, symbols: list = STABLECOIN_SYMS, ids: list = STABLECOIN_IDS,
+                          currency: str = CURRENCY, start: str = START, end: str = END) -> dict:
+    from rfa_utils import coingecko_api as ca
+    return ca.update_api_dict(data, symbols, ids, currency, start, end)
+
+
+def stablecoin_fees(start: str = START, end: str = END, timeframe: str = '1d'):
+    from rfa_utils import owlracle_api as oa
+    return cache.stage(oa.create_df)(start, end, timeframe)
+
+
+def stablecoin_fees_update(df, start: str = START, end: str = END, timeframe: str = '1d'):
+    from rfa_utils import owlracle_api as oa
+    return oa.update_df(df, start, end, timeframe)
+
+
+def stablecoin_combined() -> dict:
+    api = import_filled(os.path.join(STABLECOIN_DIR, 'filled-api-data.xlsx'), os.path.join(STABLECOIN_DIR, 'api-data.xlsx'), STABLECOIN_SYMS)
+    # Add the fees dataframe to the API data
+    api['fees'] = gf.import_data(os.path.join(STABLECOIN_DIR, 'fees-data.xlsx'), ['Sheet1'])['Sheet1']
+    return api
+
+
+def stablecoin_imputed(names: list = STABLECOIN_SYMS, ignore: tuple = ('busd', 'dai'), fees_limits: tuple = (0.01, 0.01),
+                       datasets: int = 3, iterations: int = 3, random_state: int = 123) -> dict:
+    from rfa_utils import clean_crypto as cc
+    combined = gf.import_data(os.path.join(STABLECOIN_DIR, 'combined-data.xlsx'), names + ['fees'])
+    impute = cache.stage(cc.impute_dfs, ignore=('workers',))
+    imputed = impute(combined, ignore, workers=os.cpu_count(), datasets=datasets, iterations=iterations, random_state=random_state)
+    # Winsorize fees column
+    imputed['fees'] = cc.winsorize_df(imputed['fees'], fees_limits)
+    return imputed
+
+
+def crypto_correlations() -> None:
+    from rfa_utils.panel import Panel
+    from rfa_utils import correlation as corr
+    # Rolling and per-token correlations are pandas frames, save_correlations converts them for the store
+    corrs = corr.build_correlations(Panel.from_store(os.path.join(CRYPTO_DIR, 'imputed-data.xlsx'), CRYPTO_SYMS))
+    corr.save_correlations(os.path.join(ANALYSIS_DIR, 'crypto-correlations'), corrs)
+
+
+def crypto_features() -> None:
+    from rfa_utils import features as feat
+    # Fee percentage series of the analysis, without XMR
+    crypto = gf.import_data(os.path.join(CRYPTO_DIR, 'imputed-data.xlsx'), [s for s in CRYPTO_SYMS if s != 'xmr'])
+    feat.save_features(os.path.join(ANALYSIS_DIR, 'crypto-features'), feat.build_features(crypto))
+
+
+def stablecoin_features() -> None:
+    from rfa_utils import features as feat
+    # Volumes of the stablecoins and the gas fees of the fees frame in one set of series
+    stablecoin = gf.import_data(os.path.join(STABLECOIN_DIR, 'imputed-data.xlsx'), STABLECOIN_SYMS + ['fees'])
+    feat.save_features(os.path.join(ANALYSIS_DIR, 'stablecoin-features'), feat.build_features(stablecoin))
+
+
+def remittance_cube() -> dict:
+    from rfa_utils import remittance_cube as rc
+    remit = gf.import_data(os.path.join(REMITTANCE_DIR, 'remittance-data.xlsx'), ['country-lookup', *rc.DATASETS.values()])
+    facts = rc.build_facts(remit)
+    return {'facts': facts, 'aggregates': rc.build_aggregates(facts)}
+
+
+def remittance_long() -> None:
+    from rfa_utils import wb_ingest as wb
+    # Streamed straight to the store, the long table is never held in memory as a whole
+    wb.ingest(gf.sheet_path(os.path.join(REMITTANCE_DIR, 'remittance-long'), 'long'))
+
+
+def to_pandas(dfs: dict) -> dict:
+    """Convert dataframes to pandas indexed by date"""
+    return {name: df.to_pandas().set_index('date') for name, df in dfs.items()}
+
+
+def analysis() -> dict:
+    import polars as pl
+    import pandas as pd
+    from rfa_ana import analysis as ana
+    from rfa_utils import remittance_cube as rc
+    from rfa_utils.panel import Panel
+    # Crypto fee percentages except XMR
+    crypto_syms = [s for s in CRYPTO_SYMS if s != 'xmr']
+    crypto = Panel.from_store(os.path.join(CRYPTO_DIR, 'imputed-data.xlsx'), crypto_syms)
+    crypto_fees = ana.combine_average_case(ana.crypto_fees_scenarios(ana.crypto_fee_percentage(crypto)))
+    stablecoin = to_pandas(gf.import_data(os.path.join(STABLECOIN_DIR, 'imputed-data.xlsx'), ['fees']))
+    stablecoin_fees = ana.stablecoin_fees_scenarios(stablecoin['fees'])
+    # Remittance costs to country, forecast past the last observed year
+    cube = rc.import_cube(os.path.join(ANALYSIS_DIR, 'remittance-cube'))
+    tables = []
+    for group in ['Income', 'Region']:
+        table = rc.cube_pivot(cube, 'cost_to', group)
+        # Years and groups without observations are dropped, as in pivot_table
+        table = table.dropna(how='all').dropna(axis=1, how='all')
+        pred = ana.predict_remittance_cost(table, years=[y for y in range(2019, 2023) if y not in table.index])
+        tables.append(pd.concat([table, pred]))
+    all_fees = pd.concat([crypto_fees, stablecoin_fees, *[t[(t.index >= 2019) & (t.index <= 2022)] for t in tables]], axis=1)
+    all_fees.index.name = 'year'
+    return {'all_fees': pl.from_pandas(all_fees.reset_index())}
+
+
+def fee_simulation() -> dict:
+    import polars as pl
+    from rfa_ana import simulation as sim
+    from rfa_utils import remittance_cube as rc
+    from rfa_utils.panel import Panel
+    crypto_syms = [s for s in CRYPTO_SYMS if s != 'xmr']
+    crypto = Panel.from_store(os.path.join(CRYPTO_DIR, 'imputed-data.xlsx'), crypto_syms)
+    gas_fees = to_pandas(gf.import_data(os.path.join(STABLECOIN_DIR, 'imputed-data.xlsx'), ['fees']))['fees']
+    cube = rc.import_cube(os.path.join(ANALYSIS_DIR, 'remittance-cube'))
+    methods = sim.cost_methods(crypto, gas_fees, cube)
+    years = list(range(int(START[:4]), int(END[:4]) + 1))
+    bands = sim.simulate_costs(methods, years, workers=os.cpu_count())
+    return {'bands': pl.from_pandas(bands.reset_index())}
+
+
+def report(out_dir: str = REPORT_DIR, formats: tuple = ('png',)) -> None:
+    from rfa_eda import report as rep
+    from rfa_utils import features as feat
+    from rfa_utils import correlation as corr
+    from rfa_utils import remittance_cube as rc
+    crypto = to_pandas(gf.import_data(os.path.join(CRYPTO_DIR, 'imputed-data.xlsx'), CRYPTO_SYMS))
+    stablecoin = to_pandas(gf.import_data(os.path.join(STABLECOIN_DIR, 'imputed-data.xlsx'), STABLECOIN_SYMS + ['fees']))
+    cube = rc.import_cube(os.path.join(ANALYSIS_DIR, 'remittance-cube'))
+    # Remittance costs to country by income and region, named like cost_to_income for the figure labels
+    tables = {f'cost_to_{group.lower()}': rc.cube_pivot(cube, 'cost_to', group) for group in ['Income', 'Region']}
+    jobs = rep.eda_jobs(
+        crypto, stablecoin, tables,
+        correlations=corr.load_correlations(os.path.join(ANALYSIS_DIR, 'crypto-correlations')),
+        crypto_features=feat.load_features(os.path.join(ANALYSIS_DIR, 'crypto-features')),
+        stablecoin_features=feat.load_features(os.path.join(ANALYSIS_DIR, 'stablecoin-features'))
+    )
+    # Figures whose inputs did not change are skipped through the report manifest
+    rep.render_report(jobs, out_dir, formats, workers=os.cpu_count())
+
+
+STAGES = {stage.name: stage for stage in [
+    Stage('crypto_api', crypto_api, os.path.join(CRYPTO_DIR, 'api-data.xlsx'), update=crypto_api_update),
+    Stage('crypto_scraped', crypto_scraped, os.path.join(CRYPTO_DIR, 'scraped-data.xlsx')),
+    Stage('crypto_combined', crypto_combined, os.path.join(CRYPTO_DIR, 'combined-data.xlsx'), ('crypto_api', 'crypto_scraped')),
+    Stage('crypto_imputed', crypto_imputed, os.path.join(CRYPTO_DIR, 'imputed-data.xlsx'), ('crypto_combined',)),
+    Stage('stablecoin_api', stablecoin_api, os.path.join(STABLECOIN_DIR, 'api-data.xlsx'), update=stablecoin_api_update),
+    Stage('stablecoin_fees', stablecoin_fees, os.path.join(STABLECOIN_DIR, 'fees-data.xlsx'), update=stablecoin_fees_update),
+    Stage('stablecoin_combined', stablecoin_combined, os.path.join(STABLECOIN_DIR, 'combined-data.xlsx'), ('stablecoin_api', 'stablecoin_fees')),
+    Stage('stablecoin_imputed', stablecoin_imputed, os.path.join(STABLECOIN_DIR, 'imputed-data.xlsx'), ('stablecoin_combined',)),
+    Stage('crypto_features', crypto_features, os.path.join(ANALYSIS_DIR, 'crypto-features'), ('crypto_imputed',)),
+    Stage('stablecoin_features', stablecoin_features, os.path.join(ANALYSIS_DIR, 'stablecoin-features'), ('stablecoin_imputed',)),
+    Stage('crypto_correlations', crypto_correlations, os.path.join(ANALYSIS_DIR, 'crypto-correlations'), ('crypto_imputed',)),
+    Stage('remittance_cube', remittance_cube, os.path.join(ANALYSIS_DIR, 'remittance-cube')),
+    Stage('remittance_long', remittance_long, os.path.join(REMITTANCE_DIR, 'remittance-long')),
+    Stage('fee_simulation', fee_simulation, os.path.join(ANALYSIS_DIR, 'fee-simulation'), ('crypto_imputed', 'stablecoin_imputed', 'remittance_cube')),
+    Stage('analysis', analysis, os.path.join(ANALYSIS_DIR, 'all-fees'), ('crypto_imputed', 'stablecoin_imputed', 'remittance_cube')),
+    Stage('report', report, os.path.join(REPORT_DIR, 'report.html'), ('crypto_imputed', 'stablecoin_imputed', 'crypto_features', 'stablecoin_features', 'crypto_correlations', 'remittance_cube')),
+]}
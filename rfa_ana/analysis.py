@@ -1,28 +1,42 @@
+import functools
+import numpy as np
 import pandas as pd
-import seaborn as sns
-import statsmodels.api as sm
-import matplotlib.pyplot as plt
+from rfa_utils.features import build_features
+from rfa_utils.panel import Panel
 
-sns.set(style="whitegrid") 
+
+@functools.lru_cache(maxsize=None)
+def plot_libs() -> tuple:
+    """Import seaborn and pyplot on the first plot and set the whitegrid style"""
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.set(style="whitegrid")
+    return sns, plt
 
 
 def crypto_fee_percentage(dfs: dict) -> dict:
     """Calculate and create a new column for fee percentage based on average transaction fees and values"""
+    if isinstance(dfs, Panel):
+        # All symbols at once on the (symbol x date) arrays
+        fees = dfs.array('average_transaction_fees') / dfs.array('average_transaction_value') * 100
+        present = dfs.present[dfs.metrics.index('average_transaction_fees')] & dfs.present[dfs.metrics.index('average_transaction_value')]
+        return dfs.assign('fee_percentage', fees, present)
     for _, df in dfs.items():
         df['fee_percentage'] = (df['average_transaction_fees'] / df['average_transaction_value']) * 100
     return dfs
 
 
-def crypto_fee_percentage_lineplot(dfs: dict) -> None:
+def crypto_fee_percentage_lineplot(dfs: dict, features: dict = None) -> None:
     """Plot the fee percentage column for all dataframes in the dictionary on a weekly basis"""
+    # Weekly medians smoothed with a 4 week rolling mean, read from the feature series
+    features = features or build_features(dfs)
+    df_roll = features['fee_percentage_weekly_median_roll4']
+    sns, plt = plot_libs()
     plt.figure(figsize=(10, 6))
-    for name, df in dfs.items():
-        # Resample to weekly frequency 
-        df_weekly = df.resample('W').median()  
-        # Calculate rolling mean with 4 week window
-        df_roll = df_weekly.rolling(4, min_periods=1).mean()
+    # Stored features can leave out symbols (e.g. xmr), so only the symbols with a feature column are plotted
+    for name in [name for name in dfs if name in df_roll.columns]:
         # Plot smoothed line
-        sns.lineplot(data=df_roll, x=df_roll.index, y='fee_percentage', label=name)
+        sns.lineplot(x=df_roll.index, y=df_roll[name], label=name)
     plt.xlabel('date')
     plt.ylabel('Fee Percentage')
     plt.title('Fee Percentage Plot (Weekly)')
@@ -31,95 +45,129 @@ def crypto_fee_percentage_lineplot(dfs: dict) -> None:
     plt.show()
 
 
-def crypto_fees_scenarios(dfs: dict) -> pd.DataFrame:
-    """Create a dataframe that has different scenarios for each year for crypto fee percentage"""
-    scenario_data = []
-    for name, df in dfs.items():
-        for year in range(2019, 2023):
-            df_year = df[df.index.year == year]
-            # Get the mean value of fee_percentage directly
-            fee_percent = df_year['fee_percentage'].describe().loc['mean']
-            # Get the mean value of 24h_volume directly
-            volume_weight = df_year['24h_volume'].mean()
-            scenario_data.append({
-                'crypto': name,
-                'year': year,
-                'mean_fee_percent': fee_percent,
-                'volume_weight': volume_weight
-            })
-    # Create dataframe and reorder columns
-    scenario_df = pd.DataFrame(scenario_data)
-    scenario_df = scenario_df.reindex(columns=['crypto', 'year', 'mean_fee_percent', 'volume_weight'])
+def period_key(index: pd.DatetimeIndex, period: str = 'year') -> pd.Index:
+    """Return the year, quarter or month of each date in a datetime index"""
+    if period == 'year':
+        # DatetimeIndex.year is int32 in pandas 2, years stay int64 like the other tables
+        return index.year.astype('int64')
+    elif period == 'quarter':
+        return index.to_period('Q')
+    elif period == 'month':
+        return index.to_period('M')
+    raise ValueError(f"Period must be 'year', 'quarter' or 'month', got '{period}'.")
+
+
+def scenario_engine(dfs: dict, value_col: str, weight_col: str = None, period: str = 'year',
+                    stats: tuple = ('mean',), amounts: tuple = None) -> pd.DataFrame:
+    """Aggregate a column for every symbol and period in one group-by.
+    Stats can be mean, median or pXX percentiles. With a weight column the mean weight and the weighted mean
+    are added, with transfer amounts each stat is also given as a percentage of every amount"""
+    # Stack all symbols into one long frame with a symbol index level
+    long_df = pd.concat({name: df for name, df in dfs.items()}, names=['symbol', 'date'])
+    dates = pd.DatetimeIndex(long_df.index.get_level_values('date'))
+    # Ordered symbols keep the groups in input order instead of sorting them by name
+    symbols = pd.CategoricalIndex(long_df.index.get_level_values('symbol'), categories=list(dfs), ordered=True)
+    keys = [symbols.rename('symbol'), period_key(dates, period).rename(period)]
+    values = long_df[value_col]
+    grouped = values.groupby(keys, observed=True)
+    result = pd.DataFrame({
+        stat: grouped.quantile(int(stat[1:]) / 100) if stat[1:].isdigit() else grouped.agg(stat)
+        for stat in stats
+    })
+    if weight_col:
+        weights = long_df[weight_col]
+        result['volume_weight'] = weights.groupby(keys, observed=True).mean()
+        # Weighted mean within each group, from the same keys
+        weighted = (values * weights).groupby(keys, observed=True).sum()
+        result['weighted_mean'] = weighted / weights.where(values.notna()).groupby(keys, observed=True).sum()
+    if amounts:
+        for amount in amounts:
+            for stat in stats:
+                result[f'{stat}_{amount}'] = (result[stat] / amount) * 100
+    result = result.reset_index()
+    result['symbol'] = result['symbol'].astype(object)
+    return result
+
+
+def crypto_fees_scenarios(dfs: dict, period: str = 'year', stats: tuple = ('mean',)) -> pd.DataFrame:
+    """Create a dataframe that has different scenarios for each period for crypto fee percentage"""
+    scenario_df = scenario_engine(dfs, 'fee_percentage', '24h_volume', period, stats)
+    # Rename and reorder columns
+    scenario_df = scenario_df.rename(columns={'symbol': 'crypto', **{stat: f'{stat}_fee_percent' for stat in stats}})
+    scenario_df = scenario_df.reindex(columns=['crypto', period, *[f'{stat}_fee_percent' for stat in stats], 'volume_weight'])
     return scenario_df
 
 
-def combine_average_case(scenario_df: pd.DataFrame) -> pd.DataFrame:
-    """Create a dataframe that has the weighted_average_case for each year using the volume_weight"""
-    combined_data = []
-    for year in range(2019, 2023):
-        scenario_df_year = scenario_df[scenario_df['year'] == year]
-        # Calculate the weighted_average_case using the formula
-        weighted_mean_fee = (scenario_df_year['mean_fee_percent'] * scenario_df_year['volume_weight']).sum() / scenario_df_year['volume_weight'].sum()
-        combined_data.append({
-            'year': year, 
-            'Crypto': weighted_mean_fee * 100
-        })
-    # Create dataframe
-    combined_df = pd.DataFrame(combined_data)
-    combined_df.index = combined_df['year']
-    combined_df = combined_df.drop(columns=['year'])
+def combine_average_case(scenario_df: pd.DataFrame, stat: str = 'mean', period: str = 'year') -> pd.DataFrame:
+    """Create a dataframe that has the weighted_average_case for each period using the volume_weight"""
+    weights = scenario_df['volume_weight']
+    weighted = (scenario_df[f'{stat}_fee_percent'] * weights).groupby(scenario_df[period])
+    # Calculate the weighted_average_case for every period at once
+    combined_df = (weighted.sum() / weights.groupby(scenario_df[period]).sum() * 100).to_frame('Crypto')
     return combined_df
 
 
-def plot_gas_fees(df: pd.DataFrame) -> None:
+def plot_gas_fees(df: pd.DataFrame, features: dict = None) -> None:
     """Plot the Ethereum transaction fees and gas prices on a weekly basis"""
+    features = features or build_features({'fees': df})
+    df_weekly = features['transaction_fees_weekly_mean']
+    sns, plt = plot_libs()
     plt.figure(figsize=(12, 6))
-    # Resample to weekly frequency
-    df_weekly = df.resample('W').mean()
     # Use the index as the x-axis
-    sns.lineplot(data=df_weekly, x=df_weekly.index, y='transaction_fees')
+    sns.lineplot(x=df_weekly.index, y=df_weekly['fees'])
     plt.xlabel('Date')
     plt.ylabel('Gas Fees (Dollar)')
     plt.title('Ethereum Gas Fees Plot (Weekly)')
     plt.show()
 
 
-def stablecoin_fees_scenarios(df: pd.DataFrame) -> pd.DataFrame:
-    """Create a dataframe that has different scenarios for Ethereum gas fees each year"""
-    scenario_data = []
-    for year in range(2019, 2023):
-        df_year = df[df.index.year == year]
-        # Get the mean value of transaction_fees directly
-        mean_fee = df_year['transaction_fees'].describe().loc['mean']
-        # Calculate fee percentage for $200
-        scenario_data.append({
-            'year': year,
-            'Stablecoin': (mean_fee / 200) * 100
-        })
-    scenario_df = pd.DataFrame(scenario_data)
-    scenario_df.index = scenario_df['year']
-    scenario_df = scenario_df.drop(columns=['year'])
-    return scenario_df
+def stablecoin_fees_scenarios(df: pd.DataFrame, amounts: tuple = (200,), period: str = 'year', stat: str = 'mean') -> pd.DataFrame:
+    """Create a dataframe that has different scenarios for Ethereum gas fees each period"""
+    scenario_df = scenario_engine({'Stablecoin': df}, 'transaction_fees', period=period, stats=(stat,), amounts=amounts)
+    scenario_df = scenario_df.set_index(period)
+    # Fee percentage for each transfer amount
+    if len(amounts) == 1:
+        return scenario_df[[f'{stat}_{amounts[0]}']].rename(columns={f'{stat}_{amounts[0]}': 'Stablecoin'})
+    return scenario_df[[f'{stat}_{amount}' for amount in amounts]].rename(
+        columns={f'{stat}_{amount}': f'Stablecoin ({amount})' for amount in amounts}
+    )
 
 
-def predict_remittance_cost(df: pd.DataFrame) -> pd.DataFrame:
-    """Predict remittance costs for the year 2021 and 2022 using linear regression"""
-    # Empty predictions dataframe
-    pred_df = pd.DataFrame(columns=df.columns)
-    for col in df.columns:
-        # Year and remittance cost variables
-        X = df.index.values
-        y = df[col].values
-        # Year constant term
-        X = sm.add_constant(X)
-        # Fit model with Ordinary Least Squares
-        model = sm.OLS(y, X).fit()
-        # Predict with fitted model
-        pred_X = sm.add_constant([2021, 2022])
-        pred_y = model.predict(pred_X)
-        # Add the predictions to the dataframe
-        pred_df[col] = pred_y
+def predict_remittance_cost(df: pd.DataFrame, years: list = None, horizon: int = 2, intervals: bool = False,
+                            alpha: float = 0.05) -> pd.DataFrame or tuple:
+    """Predict remittance costs for the years after the data (or the given years) using linear regression.
+    All columns are fitted at once against the shared year design, skipping missing values per column.
+    With intervals, also return the lower and upper prediction interval dataframes"""
+    if years is None:
+        years = list(range(df.index.max() + 1, df.index.max() + 1 + horizon))
+    x = df.index.values.astype(float)[:, None]
+    y = df.values.astype(float)
+    # Mask of observed values, each column is fitted on its own observations
+    mask = ~np.isnan(y)
+    y0 = np.where(mask, y, 0)
+    n = mask.sum(axis=0)
+    # Least squares for intercept and slope of every column from masked sums
+    x_mean = (mask * x).sum(axis=0) / n
+    y_mean = y0.sum(axis=0) / n
+    sxx = (mask * (x - x_mean) ** 2).sum(axis=0)
+    sxy = (mask * (x - x_mean) * (y0 - y_mean)).sum(axis=0)
+    slope = sxy / sxx
+    intercept = y_mean - slope * x_mean
+    # Predict with fitted models
+    pred_x = np.asarray(years, dtype=float)[:, None]
+    pred_y = intercept + slope * pred_x
+    pred_df = pd.DataFrame(pred_y, index=years, columns=df.columns)
     # Set the index of dataframe
-    pred_df.index = [2021, 2022]
     pred_df.index.name = df.index.name
-    return pred_df
\ No newline at end of file
+    if not intervals:
+        return pred_df
+    # Prediction intervals from the residual variance of each column
+    from scipy.stats import t
+    resid = np.where(mask, y - (intercept + slope * x), 0)
+    dof = n - 2
+    s2 = (resid ** 2).sum(axis=0) / dof
+    se = np.sqrt(s2 * (1 + 1 / n + (pred_x - x_mean) ** 2 / sxx))
+    margin = t.ppf(1 - alpha / 2, dof) * se
+    lower_df = pd.DataFrame(pred_y - margin, index=pred_df.index, columns=df.columns)
+    upper_df = pd.DataFrame(pred_y + margin, index=pred_df.index, columns=df.columns)
+    return pred_df, lower_df, upper_df
@@ -0,0 +1,102 @@
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from rfa_utils.features import date_indexed
+
+AMOUNTS = (50, 100, 200, 500, 1000)
+PERCENTILES = (5, 25, 50, 75, 95)
+SEED_BLOCK = 50_000  # Draws per seeded block, chunks are made of whole blocks
+_methods = None
+
+
+def cost_methods(crypto: dict, gas_fees: pd.DataFrame = None, cube: dict = None,
+                 fee_col: str = 'average_transaction_fees', value_col: str = 'average_transaction_value') -> dict:
+    """Collect the historical daily observations of every method as plain arrays for sampling.
+    Returns name -> (kind, years, fees, values), where crypto and stablecoin fees are in dollars
+    and remittance costs are already a percentage of the amount sent"""
+    methods = {}
+    for name, df in crypto.items():
+        df = date_indexed(df)[[fee_col, value_col]].dropna()
+        methods[name] = ('usd', df.index.year.values, df[fee_col].to_numpy(float), df[value_col].to_numpy(float))
+    if gas_fees is not None:
+        fees = date_indexed(gas_fees)['transaction_fees'].dropna()
+        methods['Stablecoin'] = ('usd', fees.index.year.values, fees.to_numpy(float), None)
+    if cube is not None:
+        # Corridor costs of sending $200 to each country
+        costs = cube['facts'].select(['year', 'cost_to']).drop_nulls()
+        methods['Remittance'] = ('percent', costs['year'].to_numpy(), costs['cost_to'].to_numpy(), None)
+    return methods
+
+
+def _init_worker(methods: dict) -> None:
+    """Keep the method arrays in each worker process so they are only sent once"""
+    global _methods
+    _methods = methods
+
+
+def simulate_chunk(year: int, blocks: list, amounts: tuple, use_values: bool, methods: dict = None) -> dict:
+    """Price the transfers of each (draws, seed) block on random days of a year for every method, as fee percentages"""
+    methods = _methods if methods is None else methods
+    block_costs = [simulate_block(year, draws, amounts, use_values, seed, methods) for draws, seed in blocks]
+    return {name: np.concatenate([costs[name] for costs in block_costs]) for name in methods}
+
+
+def simulate_block(year: int, draws: int, amounts: tuple, use_values: bool, seed, methods: dict) -> dict:
+    """Price draws transfers of the sampled amounts on random days of a year for every method, as fee percentages"""
+    rng = np.random.default_rng(seed)
+    # The same amounts are used for every method so they are compared on equal draws
+    sampled = rng.choice(np.asarray(amounts, dtype=float), draws)
+    costs = {}
+    for name, (kind, years, fees, values) in methods.items():
+        rows = np.flatnonzero(years == year)
+        if rows.size == 0:
+            costs[name] = np.full(draws, np.nan, dtype=np.float32)
+            continue
+        idx = rows[rng.integers(0, rows.size, draws)]
+        if kind == 'percent':
+            cost = fees[idx]
+        else:
+            # Priced at the day's transaction value when asked, as in crypto_fee_percentage
+            amount = values[idx] if use_values and values is not None else sampled
+            cost = fees[idx] / amount * 100
+        costs[name] = cost.astype(np.float32)
+    return costs
+
+
+def simulate_costs(methods: dict, years: list, draws: int = 1_000_000, amounts: tuple = AMOUNTS, use_values: bool = False,
+                   percentiles: tuple = PERCENTILES, workers: int = 1, chunk_size: int = 250_000, seed: int = 123) -> pd.DataFrame:
+    """Monte Carlo fee percentages of every method for each year, summarized as percentile bands and a mean.
+    Draws are split into blocks of SEED_BLOCK seeded from one seed sequence per year and run in chunks of whole blocks,
+    so results do not depend on the worker count or the chunk size"""
+    sizes = [min(SEED_BLOCK, draws - start) for start in range(0, draws, SEED_BLOCK)]
+    per_chunk = max(1, chunk_size // SEED_BLOCK)
+    jobs = []
+    for year, year_seed in zip(years, np.random.SeedSequence(seed).spawn(len(years))):
+        blocks = list(zip(sizes, year_seed.spawn(len(sizes))))
+        jobs += [(year, blocks[i:i + per_chunk]) for i in range(0, len(blocks), per_chunk)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(methods,)) as executor:
+            futures = [executor.submit(simulate_chunk, year, blocks, amounts, use_values) for year, blocks in jobs]
+            results = [future.result() for future in futures]
+    else:
+        results = [simulate_chunk(year, blocks, amounts, use_values, methods) for year, blocks in jobs]
+    rows = []
+    for year in years:
+        year_results = [r for (y, _), r in zip(jobs, results) if y == year]
+        # (method, draw) costs of the year, summarized for all methods at once
+        costs = np.stack([np.concatenate([r[name] for r in year_results]) for name in methods])
+        costs = np.where(np.isfinite(costs), costs, np.nan)
+        with warnings.catch_warnings():
+            # Methods without observations in the year only get NaN bands
+            warnings.simplefilter('ignore', RuntimeWarning)
+            bands = np.nanpercentile(costs, percentiles, axis=1)
+            means = np.nanmean(costs, axis=1)
+        for i, name in enumerate(methods):
+            rows.append({'method': name, 'year': year, **{f'p{p}': bands[j, i] for j, p in enumerate(percentiles)}, 'mean': means[i]})
+    bands_df = pd.DataFrame(rows).set_index(['method', 'year'])
+    if 'Remittance' in methods:
+        # Median cost relative to the median corridor cost of the same year
+        corridor = bands_df.xs('Remittance', level='method')['p50']
+        bands_df['p50_vs_remittance'] = bands_df['p50'] / corridor.reindex(bands_df.index.get_level_values('year')).values
+    return bands_df
@@ -2,6 +2,8 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from tabulate import tabulate
+from rfa_utils.panel import Panel
+from rfa_utils.correlation import metric_corrs
 
 sns.set(style="whitegrid") 
 
@@ -30,6 +32,10 @@ def get_value_column(df: pd.DataFrame) -> str:
 
 def fees_df(dfs: dict) -> pd.DataFrame:
     """Create a dataframe of transaction fees"""
+    if isinstance(dfs, Panel):
+        # Median fees where a symbol has them, else average fees
+        return pd.DataFrame({token: dfs.array(get_fees_column(df))[dfs.symbols.index(token)] for token, df in dfs.items()},
+                            index=dfs.dates)
     fees_data = pd.DataFrame()
     for token, df in dfs.items():
         col_name = get_fees_column(df)
@@ -39,6 +45,8 @@ def fees_df(dfs: dict) -> pd.DataFrame:
 
 def transactions_df(dfs: dict) -> pd.DataFrame:
     """Create a dataframe of transaction values"""
+    if isinstance(dfs, Panel):
+        return dfs.metric('transactions_count')
     transactions_data = pd.DataFrame()
     for token, df in dfs.items():
         transactions_data[token] = df['transactions_count']
@@ -61,15 +69,17 @@ def fees_boxplots(dfs: dict) -> None:
     plt.show()
 
 
-def corr_heatmaps(dfs: dict) -> None:
+def corr_heatmaps(dfs: dict, corrs: dict = None) -> None:
     """Plot the correlation heatmap of variables in each dataframe"""
+    # Correlation matrices of every token in one batched pass, or read from the correlations store
+    corrs = corrs or metric_corrs(dfs)
     fig, axes = plt.subplots(nrows=10, ncols=1, figsize=(12, 60))
     axes = axes.flatten()  
     for name, df in dfs.items():
         # Get index position of token name
         i = list(dfs.keys()).index(name)
         ax = axes[i]
-        corr_matrix = df.corr()
+        corr_matrix = corrs[name] if name in corrs else corrs[f'corr_{name}']
         sns.heatmap(corr_matrix, annot=True, ax=ax, cmap='mako_r')
         ax.set_title(name.upper())
         ax.set_xticklabels(ax.get_xticklabels(), rotation=15)
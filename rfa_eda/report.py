@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import warnings
+import matplotlib
+from typing import Callable, NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+from rfa_utils.cache import update_hash
+
+MANIFEST = 'manifest.json'
+
+
+class FigureJob(NamedTuple):
+    """An EDA plotting function with its arguments, rendered to files named after the job"""
+    name: str
+    fn: Callable
+    args: tuple = ()
+    kwargs: dict = {}
+
+
+def job_hash(job: FigureJob) -> str:
+    """Return the hash of a job's plotting function and input data"""
+    h = hashlib.sha256(f'{job.fn.__module__}.{job.fn.__qualname__}'.encode())
+    update_hash(h, list(job.args))
+    update_hash(h, job.kwargs)
+    return h.hexdigest()
+
+
+def lineplot_figure(pivot_df, group: str) -> None:
+    """Plot a remittance pivot table on its own figure"""
+    import matplotlib.pyplot as plt
+    from rfa_eda.remittance_eda import plot_lineplot
+    fig, ax = plt.subplots(figsize=(12, 5))
+    plot_lineplot(pivot_df, group, ax)
+    plt.tight_layout()
+
+
+def render_job(job: FigureJob, out_dir: str, formats: tuple = ('png',)) -> list:
+    """Run a plotting function with the Agg backend and save every figure it opened"""
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.close('all')
+    with warnings.catch_warnings():
+        # plt.show() only warns on a non-interactive backend
+        warnings.simplefilter('ignore', UserWarning)
+        job.fn(*job.args, **job.kwargs)
+    paths = []
+    fignums = plt.get_fignums()
+    for i, num in enumerate(fignums):
+        fig = plt.figure(num)
+        suffix = f'-{i + 1}' if len(fignums) > 1 else ''
+        for fmt in formats:
+            path = os.path.join(out_dir, f'{job.name}{suffix}.{fmt}')
+            fig.savefig(path, format=fmt, bbox_inches='tight')
+            paths.append(path)
+    plt.close('all')
+    return paths
+
+
+def write_report(out_dir: str, entries: dict, title: str) -> str:
+    """Write a Markdown and an HTML report with the figures of every job, return the HTML path"""
+    md = [f'# {title}', '']
+    html = [f'<html><head><meta charset="utf-8"><title>{title}</title></head><body>', f'<h1>{title}</h1>']
+    for name, paths in entries.items():
+        md += [f'## {name}', '']
+        html.append(f'<h2>{name}</h2>')
+        # Link the first format of each figure
+        figures = {}
+        for path in paths:
+            figures.setdefault(os.path.splitext(path)[0], path)
+        for path in figures.values():
+            rel = os.path.relpath(path, out_dir)
+            md += [f'![{name}]({rel})', '']
+            html.append(f'<img src="{rel}" alt="{name}" style="max-width:100%">')
+    html.append('</body></html>')
+    with open(os.path.join(out_dir, 'report.md'), 'w') as f:
+        f.write('\n'.join(md))
+    html_path = os.path.join(out_dir, 'report.html')
+    with open(html_path, 'w') as f:
+        f.write('\n'.join(html))
+    return html_path
+
+
+def render_report(jobs: list, out_dir: str = 'reports', formats: tuple = ('png',), workers: int = 4,
+                  title: str = 'Remittance Fees Analysis') -> str:
+    """Render every figure job headless across a process pool, skipping jobs whose inputs did not change"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    hashes = {job.name: job_hash(job) for job in jobs}
+    # Jobs are rerun when their hash or formats changed, or a file is missing
+    stale = [
+        job for job in jobs
+        if manifest.get(job.name, {}).get('hash') != hashes[job.name]
+        or manifest[job.name].get('formats') != list(formats)
+        or not all(os.path.exists(p) for p in manifest[job.name]['paths'])
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {job.name: executor.submit(render_job, job, out_dir, formats) for job in stale}
+        for name, future in futures.items():
+            manifest[name] = {'hash': hashes[name], 'formats': list(formats), 'paths': future.result()}
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return write_report(out_dir, {job.name: manifest[job.name]['paths'] for job in jobs}, title)
+
+
+def eda_jobs(crypto: dict = None, stablecoin: dict = None, remittance_tables: dict = None, correlations: dict = None,
+             crypto_features: dict = None, stablecoin_features: dict = None) -> list:
+    """Create the standard figure jobs of the EDA notebooks for the given pandas dataframes.
+    Correlations and feature series read from the store are reused by the heatmaps and weekly plots"""
+    from rfa_ana import analysis as ana
+    from rfa_eda import crypto_eda as ceda
+    from rfa_eda import stablecoin_eda as seda
+    jobs = []
+    # Only the per-token matrices are sent to the workers, the rolling correlations are not plotted
+    heatmap_corrs = {name: df for name, df in (correlations or {}).items() if name.startswith('corr_')} or None
+    if crypto:
+        jobs += [
+            FigureJob('crypto-fees-boxplots', ceda.fees_boxplots, (crypto,)),
+            FigureJob('crypto-corr-heatmaps', ceda.corr_heatmaps, (crypto,), {'corrs': heatmap_corrs}),
+            FigureJob('crypto-fees-scatterplots', ceda.fees_scatterplots, (crypto,))
+        ]
+        if crypto_features:
+            jobs.append(FigureJob('crypto-fee-percentage', ana.crypto_fee_percentage_lineplot, (crypto,), {'features': crypto_features}))
+    if stablecoin:
+        jobs += [
+            FigureJob('stablecoin-fees-plots', seda.fees_plots, (stablecoin['fees'],), {'features': stablecoin_features}),
+            FigureJob('stablecoin-volumes', seda.volumes_lineplot, (stablecoin,), {'features': stablecoin_features}),
+            FigureJob('stablecoin-mcaps-volumes', seda.mcaps_volumes_scatterplots, (stablecoin,))
+        ]
+    for name, pivot_df in (remittance_tables or {}).items():
+        # e.g. cost_to_income becomes "Cost To (by Income)"
+        *dataset, group = name.split('_')
+        label = f"{' '.join(dataset).title()} (by {group.title()})"
+        jobs.append(FigureJob(f'remittance-{name}', lineplot_figure, (pivot_df, label)))
+    return jobs
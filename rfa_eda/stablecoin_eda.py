@@ -2,6 +2,7 @@ import seaborn as sns
 import pandas as pd
 import matplotlib.pyplot as plt
 from tabulate import tabulate
+from rfa_utils.features import build_features
 
 
 def fees_stats(df: pd.DataFrame) -> None:
@@ -17,14 +18,15 @@ def fees_stats(df: pd.DataFrame) -> None:
     print(tabulate(stats_df, headers='keys', tablefmt='fancy_grid', floatfmt='.3f'))
 
 
-def fees_plots(df: pd.DataFrame) -> None:
+def fees_plots(df: pd.DataFrame, features: dict = None) -> None:
     """Plot the transaction fees over time with a line plot and as a box plot"""
+    # Weekly mean of transaction fees from the feature series
+    features = features or build_features({'fees': df})
+    df_weekly = features['transaction_fees_weekly_mean']
     # Create a figure with two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-    # Group the data by week and calculate the mean of transaction fees
-    df_weekly = df.groupby(pd.Grouper(key='date', freq='W'))['transaction_fees'].mean().reset_index()
-    # Plot the monthly data with lineplot
-    sns.lineplot(data=df_weekly, x='date', y='transaction_fees', ax=ax1)
+    # Plot the weekly data with lineplot
+    sns.lineplot(x=df_weekly.index, y=df_weekly['fees'], ax=ax1)
     ax1.set_xlabel('Date')
     ax1.set_ylabel('Fees (Dollar)')
     ax1.set_title('Transaction Fees over Time')
@@ -39,18 +41,11 @@ def fees_plots(df: pd.DataFrame) -> None:
     plt.show()
 
 
-def volumes_lineplot(dfs: dict) -> None:
+def volumes_lineplot(dfs: dict, features: dict = None) -> None:
     """Plot the 24 volumes of all stablecoins in a line plot"""
-    # Create an empty dataframe to store the total volumes
-    df_volumes = pd.DataFrame()
-    # Loop and append each token's total volume
-    for token in dfs.keys():
-        if token != 'fees':
-            df = dfs[token]
-            df_volumes[token] = df['24h_volume']
-    # Set date index and resample to weekly
-    df_volumes.index = pd.date_range(start='2019-01-01', end='2022-12-31', freq='D', name='date')
-    df_volumes = df_volumes.resample('W').mean()
+    # Weekly mean volumes on the data's own date index, the fees frame has no volume
+    features = features or build_features({token: df for token, df in dfs.items() if token != 'fees'})
+    df_volumes = features['24h_volume_weekly_mean']
     # Set plot parameters
     plt.figure(figsize=(14, 8))
     sns.lineplot(data=df_volumes)
@@ -0,0 +1,177 @@
+import os
+import sys
+import shutil
+import inspect
+import hashlib
+import functools
+import polars as pl
+from decimal import Decimal
+from pathlib import PurePath
+from collections.abc import Mapping
+from datetime import date, time, timedelta
+from types import BuiltinFunctionType, FunctionType
+from typing import Any, Callable
+from rfa_utils import general_fns as gf
+
+CACHE_DIR = os.path.join('data', '.cache')
+MAX_BYTES = 2 * 1024 ** 3   # Evict least recently used results above 2 GB
+KEY_FILE = '.stage-key'
+# Argument types that are keyed by type only, matched on their module and class name
+CLIENT_TYPES = ('selenium.', 'requests.', 'rfa_utils.crypto_scrape.', 'rfa_utils.coingecko_api.RateLimiter')
+
+
+def is_client(obj: Any) -> bool:
+    """Check if an argument is a client such as a webdriver or HTTP session, which does not change the result"""
+    name = f'{type(obj).__module__}.{type(obj).__qualname__}'
+    return name.startswith(CLIENT_TYPES)
+
+
+def update_hash(h: 'hashlib._Hash', obj: Any) -> None:
+    """Feed an argument into the hash, walking dicts and lists and hashing dataframe and array contents.
+    Raise TypeError for arguments whose contents cannot be hashed"""
+    # pandas and NumPy objects can only be passed in if they are already imported
+    pd = sys.modules.get('pandas')
+    np = sys.modules.get('numpy')
+    if isinstance(obj, pl.DataFrame):
+        h.update(repr(obj.schema).encode())
+        h.update(obj.hash_rows(seed=0).to_numpy().tobytes())
+    elif isinstance(obj, pl.LazyFrame):
+        # The plan may scan files whose contents changed, so the collected result is hashed
+        update_hash(h, obj.collect())
+    elif isinstance(obj, pl.Series):
+        h.update(f'{obj.name}{obj.dtype}'.encode())
+        h.update(obj.hash(seed=0).to_numpy().tobytes())
+    elif pd is not None and isinstance(obj, pd.DataFrame):
+        h.update(repr(obj.dtypes.to_dict()).encode())
+        h.update(pd.util.hash_pandas_object(obj).to_numpy().tobytes())
+    elif pd is not None and isinstance(obj, pd.Series):
+        h.update(f'{obj.name}{obj.dtype}'.encode())
+        h.update(pd.util.hash_pandas_object(obj).to_numpy().tobytes())
+    elif np is not None and isinstance(obj, np.ndarray):
+        h.update(f'{obj.dtype}{obj.shape}'.encode())
+        if obj.dtype.hasobject:
+            update_hash(h, obj.tolist())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, Mapping):
+        for key in sorted(obj, key=str):
+            h.update(repr(key).encode())
+            update_hash(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f'{type(obj).__name__}{len(obj)}'.encode())
+        for item in obj:
+            update_hash(h, item)
+    elif isinstance(obj, (set, frozenset)):
+        update_hash(h, sorted(obj, key=repr))
+    elif obj is None or isinstance(obj, (str, bytes, int, float, bool, date, time, timedelta, Decimal, PurePath)):
+        # datetime is a date subclass
+        h.update(f'{type(obj).__name__}{obj!r}'.encode())
+    elif np is not None and isinstance(obj, np.generic):
+        h.update(f'{obj.dtype}{obj!r}'.encode())
+    elif isinstance(obj, (FunctionType, BuiltinFunctionType, type)):
+        h.update(f'{obj.__module__}.{obj.__qualname__}'.encode())
+    elif is_client(obj):
+        # Clients only fetch the data, their type is keyed
+        h.update(type(obj).__qualname__.encode())
+    else:
+        raise TypeError(f'Cannot hash argument of type {type(obj).__qualname__} for the cache key.')
+
+
+def call_arguments(fn: Callable, args: tuple, kwargs: dict) -> dict:
+    """Return the arguments of a call by parameter name, including the defaults it leaves out"""
+    try:
+        signature = inspect.signature(fn)
+    except ValueError:
+        # Some builtins have no signature, their arguments are keyed as passed
+        return {'args': list(args), 'kwargs': kwargs}
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def stage_key(fn: Callable, args: tuple, kwargs: dict, ignore: tuple = ()) -> str:
+    """Return the content hash of a stage function with its inputs and parameters.
+    Arguments named in ignore (e.g. workers) do not change the result and are left out"""
+    h = hashlib.sha256()
+    h.update(f'{fn.__module__}.{fn.__qualname__}{pl.__version__}'.encode())
+    arguments = call_arguments(fn, args, kwargs)
+    update_hash(h, {name: value for name, value in arguments.items() if name not in ignore})
+    return h.hexdigest()
+
+
+def dir_size(path: str) -> int:
+    """Return the total size of the files in a directory"""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def evict(cache_dir: str = CACHE_DIR, max_bytes: int = MAX_BYTES) -> None:
+    """Remove the least recently used results until the cache fits in max_bytes"""
+    entries = [entry.path for entry in os.scandir(cache_dir) if entry.is_dir()]
+    # Results are touched on every hit, so the oldest modification time is the least recently used
+    entries.sort(key=os.path.getmtime)
+    total = sum(dir_size(path) for path in entries)
+    while entries and total > max_bytes:
+        path = entries.pop(0)
+        total -= dir_size(path)
+        shutil.rmtree(path)
+
+
+def load(path: str) -> dict or pl.DataFrame:
+    """Load a cached result, unwrapping single dataframes"""
+    data = gf.import_store(path, gf.store_names(path), memory_map=False)
+    if list(data) == ['Sheet1']:
+        return data['Sheet1']
+    return data
+
+
+def stage(fn: Callable, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_BYTES, ignore: tuple = ()) -> Callable:
+    """Wrap a stage function so results are cached on disk by a hash of its inputs and parameters"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Hash before calling, some stages modify their input dicts in place
+        key = stage_key(fn, args, kwargs, ignore)
+        path = os.path.join(cache_dir, key)
+        if gf.store_exists(path):
+            os.utime(path)
+            return load(path)
+        result = fn(*args, **kwargs)
+        gf.create_store(path, result)
+        evict(cache_dir, max_bytes)
+        return result
+    wrapper.key = lambda *args, **kwargs: stage_key(fn, args, kwargs, ignore)
+    return wrapper
+
+
+def read_key(file_path: str) -> str:
+    """Return the stage key recorded in a data store, or an empty string"""
+    key_path = os.path.join(gf.store_path(file_path), KEY_FILE)
+    if not os.path.exists(key_path):
+        return ''
+    with open(key_path) as f:
+        return f.read().strip()
+
+
+def write_key(file_path: str, key: str) -> None:
+    """Record the stage key of a data store"""
+    with open(os.path.join(gf.store_path(file_path), KEY_FILE), 'w') as f:
+        f.write(key)
+
+
+def is_current(file_path: str, key: str) -> bool:
+    """Check if a dataset exists and was built with the given key.
+    Datasets built before keys were recorded (e.g. the Excel workbooks) count as current"""
+    if not (gf.store_exists(file_path) or os.path.exists(file_path)):
+        return False
+    recorded = read_key(file_path)
+    return not recorded or recorded == key
+
+
+def check_and_build(file_path: str, create_dict_fn: Callable, *args: Any, fmt: str = 'parquet', **kwargs: Any) -> bool:
+    """Rebuild the dataset only when the inputs or parameters of its stage changed, return True if rebuilt"""
+    cached_fn = create_dict_fn if hasattr(create_dict_fn, 'key') else stage(create_dict_fn)
+    key = cached_fn.key(*args, **kwargs)
+    if is_current(file_path, key):
+        return False
+    gf.create_store(file_path, cached_fn(*args, **kwargs), fmt)
+    write_key(file_path, key)
+    return True
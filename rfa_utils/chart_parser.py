@@ -0,0 +1,33 @@
+import re
+import numpy as np
+
+# One [new Date("YYYY/MM/DD"),value] point of a BitInfoCharts chart, value may be null
+POINT = r'\[new Date\("(\d{4}/\d{2}/\d{2})"\),(null|[-+\d.eE]+)'
+POINT_RE = re.compile(POINT)
+POINT_RE_BYTES = re.compile(POINT.encode())
+
+
+def parse_chart(source: str or bytes, start: str = None, end: str = None) -> tuple:
+    """Parse the chart points of a page source in one scan, return NumPy arrays of dates and values
+    between start and end (YYYY/MM/DD, inclusive), missing values as NaN"""
+    is_bytes = isinstance(source, (bytes, bytearray, memoryview))
+    if is_bytes:
+        points = POINT_RE_BYTES.findall(source)
+    else:
+        points = POINT_RE.findall(source)
+    if not points:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+    dates, values = zip(*points)
+    dates = np.array(dates)
+    values = np.array(values)
+    # Match the encoding of the source for the comparisons below
+    enc = (lambda x: x.encode()) if is_bytes else (lambda x: x)
+    # Dates are zero padded, so the range filter can compare strings
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= enc(start)
+    if end is not None:
+        mask &= dates <= enc(end)
+    dates = np.char.replace(dates[mask], enc('/'), enc('-')).astype('datetime64[D]')
+    values = np.where(values[mask] == enc('null'), enc('nan'), values[mask])
+    return dates, values.astype(np.float64)
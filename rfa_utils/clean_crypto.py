@@ -1,23 +1,65 @@
+import functools
 import polars as pl
-import pandas as pd
-import miceforest as mf
-from scipy.stats.mstats import winsorize
-from rfa_utils.coingecko_api import fill_date
+from typing import TYPE_CHECKING
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def winsorize_df(df: pl.DataFrame, limits: tuple=(0.05, 0.05)) -> pl.DataFrame:
-    """Winsorize Messari data to remove extreme outliers"""
-    # Loop through the columns except the first one
-    for col in df.columns[1:]:
-        # Apply winsorization with 5% of the lowest/highest replaced
-        col_values = df[col].to_numpy()
-        win_values = winsorize(col_values, limits=limits)
-        new_col = pl.Series(name=col, values=win_values)
 
-        # Replace the original column with the winsorized column
-        df = df.drop(col)
-        df = df.with_columns(**{col: new_col})
-    return df
+def winsorize_bounds(col: str, limits: tuple = (0.05, 0.05)) -> tuple:
+    """Return the lower and upper bound expressions of a column with the same ranks as scipy's mstats.winsorize.
+    Only valid on eager frames or in a groupby aggregation, see winsorize_df"""
+    low, up = (limit or 0 for limit in limits)
+    n = pl.count().cast(pl.Float64)
+    # scipy counts missing values in n and sorts them last
+    ranked = pl.col(col).sort(nulls_last=True)
+    # head().last() instead of take, so an empty frame does not index out of bounds
+    lower = ranked.head((n * low).floor().cast(pl.UInt32) + 1).last()
+    upper = ranked.head((n - (n * up).floor()).cast(pl.UInt32)).last()
+    return lower, upper
+
+
+def winsorize_expr(col: str, lower: pl.Expr, upper: pl.Expr) -> pl.Expr:
+    """Return an expression that clips a column to its winsorizing bounds"""
+    values = pl.col(col)
+    return (
+        # Bounds that fall on a missing value blank the whole tail, as in scipy
+        pl.when(lower.is_null()).then(pl.lit(None))
+        .when(values < lower).then(lower)
+        .when(values > upper).then(upper)
+        # Missing values ranked in the upper tail take the upper bound
+        .when(values.is_null()).then(upper)
+        .otherwise(values)
+        .alias(col)
+    )
+
+
+def winsorize_df(df: pl.DataFrame or pl.LazyFrame, limits: tuple = (0.05, 0.05), columns: list = None,
+                 by: str or list = None) -> pl.DataFrame or pl.LazyFrame:
+    """Winsorize Messari data to remove extreme outliers"""
+    # Winsorize the columns except the first one by default
+    columns = columns or df.columns[1:]
+    if by is None and isinstance(df, pl.LazyFrame):
+        # Common subexpression elimination in polars 0.18 replaces the bounds of a lazy with_columns by their
+        # rank offsets, so the frame is winsorized eagerly as one step of the plan. Filters and slices are not
+        # pushed below it, they would change the ranks
+        winsorize = functools.partial(winsorize_df, limits=limits, columns=columns)
+        return df.map(winsorize, predicate_pushdown=False, projection_pushdown=False, slice_pushdown=False)
+    bounds, exprs = [], []
+    for col in columns:
+        lower, upper = winsorize_bounds(col, limits)
+        bounds += [lower.alias(f'__lower_{col}'), upper.alias(f'__upper_{col}')]
+        exprs.append(winsorize_expr(col, pl.col(f'__lower_{col}'), pl.col(f'__upper_{col}')))
+    if by is None:
+        df = df.with_columns(bounds)
+    else:
+        # Bounds per group (e.g. symbol or year) are aggregated and joined back, window expressions
+        # evaluate the ranks over the whole column in polars 0.18
+        df = df.join(df.groupby(by).agg(bounds), on=by, how='left')
+    temp = [f'__{side}_{col}' for col in columns for side in ('lower', 'upper')]
+    return df.with_columns(exprs).drop(temp)
 
 
 def combine_xrp_bsv(scraped: dict) -> dict:
@@ -32,51 +74,87 @@ def combine_xrp_bsv(scraped: dict) -> dict:
     return scraped
 
 
-def merge_api_scraped(api_data: dict, scraped_data: dict, names: list) -> dict:
-    """Merge API and scraped data into a single dictionary of dataframes"""
-    # Clean scraped dataframes
+def parse_date(date: str) -> datetime.date:
+    """Parse a YYYY/MM/DD string into a date"""
+    return datetime.strptime(date, '%Y/%m/%d').date()
+
+
+def fill_date_lazy(lf: pl.LazyFrame, start: datetime.date, end: datetime.date) -> pl.LazyFrame:
+    """Join a lazy frame onto every date between start and end so missing days become null rows"""
+    dates = pl.LazyFrame({'date': pl.date_range(start, end, interval='1d', eager=True)})
+    return dates.join(lf, on='date', how='left')
+
+
+def merge_plan(api_data: dict, scraped_data: dict, names: list, start: str = None, end: str = None,
+               limits: tuple = (0.05, 0.05)) -> dict:
+    """Compose winsorizing, upsampling, the XRP/BSV merge and the API join into one lazy plan per symbol.
+    Inputs can be DataFrames or LazyFrames (e.g. from gf.scan_store), LazyFrames need start and end"""
+    scraped = {k: df.lazy() for k, df in scraped_data.items()}
+    # Clean scraped dataframes, upsampling to the frame's own range unless a window is given
     for name in ['xrp_mes', 'bsv_mes', 'xlm']:
-        scraped_data[name] = winsorize_df(scraped_data[name])
-        scraped_data[name] = fill_date(scraped_data[name])
-    combine_xrp_bsv(scraped_data)
+        df = scraped_data[name]
+        first = parse_date(start) if start else df['date'].min()
+        last = parse_date(end) if end else df['date'].max()
+        scraped[name] = fill_date_lazy(winsorize_df(scraped[name], limits), first, last)
+    combine_xrp_bsv(scraped)
 
     # Merge API and scraped data
-    combined = {}
+    plans = {}
     for name in names:
-        combined[name] = api_data[name].join(scraped_data[name], on='date', how='inner')
-    return combined
+        plan = api_data[name].lazy()
+        # Filter on the window so the predicate is pushed down to the scans
+        if start:
+            plan = plan.filter(pl.col('date') >= parse_date(start))
+        if end:
+            plan = plan.filter(pl.col('date') <= parse_date(end))
+        plans[name] = plan.join(scraped[name], on='date', how='inner')
+    return plans
+
 
+def collect_plans(plans: dict) -> dict:
+    """Collect every plan together so Polars runs them in parallel"""
+    return dict(zip(plans, pl.collect_all(list(plans.values()))))
 
-def mf_impute(df: pd.DataFrame) -> pd.DataFrame:
+
+def merge_api_scraped(api_data: dict, scraped_data: dict, names: list, start: str = None, end: str = None,
+                      limits: tuple = (0.05, 0.05)) -> dict:
+    """Merge API and scraped data into a single dictionary of dataframes"""
+    return collect_plans(merge_plan(api_data, scraped_data, names, start, end, limits))
+
+
+def mf_impute(df: 'pd.DataFrame', datasets: int = 3, iterations: int = 3, random_state: int = 123) -> 'pd.DataFrame':
     """Return imputed pandas dataframe using MICE"""
+    # miceforest pulls in lightgbm, so it is only imported by the imputation
+    import miceforest as mf
     kernel = mf.ImputationKernel(
         df,
-        datasets=3,
+        datasets=datasets,
         save_all_iterations=True,
-        random_state=123
+        random_state=random_state
     )
-    # Run the MICE algorithm for 3 iterations on each of the datasets
-    kernel.mice(3)
+    # Run the MICE algorithm for the given iterations on each of the datasets
+    kernel.mice(iterations)
     return kernel.complete_data()
 
 
-def impute_dfs(dfs: dict, ignore: list = []) -> dict:
+def impute_df(df: pl.DataFrame, datasets: int = 3, iterations: int = 3, random_state: int = 123) -> pl.DataFrame:
+    """Impute every column except date, handing the date column back untouched"""
+    values = df.drop('date').to_pandas()
+    imputed = pl.from_pandas(mf_impute(values, datasets, iterations, random_state))
+    return df.select('date').hstack(imputed)
+
+
+def impute_dfs(dfs: dict, ignore: list = [], workers: int = 1, datasets: int = 3, iterations: int = 3,
+               random_state: int = 123) -> dict:
     """Impute missing values in dataframes of a dict, except for those in the ignore list"""
-    # Convert Polars to pandas
-    pandas_dfs = {k: df.to_pandas() for k, df in dfs.items()}
-    # Impute each dataframe
-    imputed = {}
-    for k, df in pandas_dfs.items():
-        # Check if the dataframe name is in the ignore list
-        if k in ignore:
-            # Skip the imputation and add the original dataframe to the imputed dictionary
-            imputed[k] = df
-        else:
-            # Proceed with the imputation as usual
-            date_series = df['date']  # Get date column as a series
-            df_no_date = df.drop('date', axis=1)
-            df_imputed = mf_impute(df_no_date)
-            # Concatenate the date back to the imputed dataframe
-            imputed[k] = pd.concat([date_series, df_imputed], axis=1)
-    # Convert pandas to Polars
-    return {k: pl.from_pandas(df) for k, df in imputed.items()}
\ No newline at end of file
+    # Each kernel is seeded on its own, so results do not depend on the worker count
+    names = [k for k in dfs if k not in ignore]
+    args = (datasets, iterations, random_state)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {k: executor.submit(impute_df, dfs[k], *args) for k in names}
+            results = {k: future.result() for k, future in futures.items()}
+    else:
+        results = {k: impute_df(dfs[k], *args) for k in names}
+    # Keep the original order with ignored dataframes passed through
+    return {k: results.get(k, df) for k, df in dfs.items()}
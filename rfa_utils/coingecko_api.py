@@ -1,9 +1,73 @@
+import requests
+import threading
+import numpy as np
 import polars as pl
-from time import sleep
-from pycoingecko import CoinGeckoAPI
-from datetime import datetime, timezone
-
-cg = CoinGeckoAPI()
+from time import sleep, monotonic
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+API_URL = 'https://api.coingecko.com/api/v3'
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Ranges up to 90 days return hourly points, so shorter refreshes fetch this many days
+DAILY_MIN_DAYS = 91
+
+
+class RateLimiter:
+    """Token bucket shared between threads to keep calls under the API rate limit"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate            # Tokens added per second
+        self.capacity = capacity    # Maximum burst of calls
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it"""
+        while True:
+            with self.lock:
+                # Refill the bucket for the time passed since the last call
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+# Public API allows around 20 calls per minute, with a small burst
+limiter = RateLimiter(rate=1 / 3, capacity=3)
+_session = None
+
+
+def get_session(pool_size: int = 10) -> requests.Session:
+    """Return the HTTP session shared by all API calls, creating it on first use"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        _session.mount('https://', adapter)
+        _session.mount('http://', adapter)
+    return _session
+
+
+def get_json(url: str, params: dict, session: requests.Session = None, rate_limiter: RateLimiter = None,
+             retries: int = 5, backoff: float = 2.0) -> dict:
+    """Make a rate limited GET request, retrying with exponential backoff on 429/5xx responses"""
+    session = session or get_session()
+    rate_limiter = rate_limiter or limiter
+    for attempt in range(retries + 1):
+        rate_limiter.acquire()
+        res = session.get(url, params=params, timeout=30)
+        if res.status_code not in RETRY_STATUS or attempt == retries:
+            break
+        # Honour Retry-After if the server sends it, else back off exponentially
+        retry_after = res.headers.get('Retry-After')
+        sleep(float(retry_after) if retry_after and retry_after.isdigit() else backoff * 2 ** attempt)
+    res.raise_for_status()
+    return res.json()
 
 
 def unix_time(date: str) -> int:
@@ -12,31 +76,30 @@ def unix_time(date: str) -> int:
     return int(stamp.replace(tzinfo=timezone.utc).timestamp())
 
 
-def api_call(name: str, currency: str, start: str, end: str) -> dict:
+def api_call(name: str, currency: str, start: str, end: str, base_url: str = API_URL) -> dict:
     """Make a call to the CoinGecko API and return the JSON response"""
     # Set start and end times to 00:00:00 and 23:59:59
     unix_start = unix_time(f'{start} 00:00:00')
     unix_end = unix_time(f'{end} 23:59:59')
-    data = cg.get_coin_market_chart_range_by_id(
-        id=name, 
-        vs_currency=currency, 
-        from_timestamp=unix_start, 
-        to_timestamp=unix_end
-    )
-    sleep(3)
-    return data
+    params = {
+        'vs_currency': currency,
+        'from': unix_start,
+        'to': unix_end
+    }
+    return get_json(f'{base_url}/coins/{name}/market_chart/range', params)
 
 
 def extract_json(data: dict) -> dict:
-    """"Extracts data from JSON and returns a dictionary without the timestamps"""
+    """"Extracts data from JSON and returns a dictionary of NumPy arrays with the timestamps"""
     data_points = {}
     timestamps_added = False  # Flag for adding timestamps to dict
     for key, value in data.items():
+        # Convert the [timestamp, value] pairs to a 2D array in one go
+        pairs = np.asarray(value, dtype=np.float64).reshape(-1, 2)
         if not timestamps_added:
-            data_points['timestamps'] = [x[0] for x in value]
+            data_points['timestamps'] = pairs[:, 0].astype(np.int64)
             timestamps_added = True
-        # Use list comprehension to get the second element of each sublist in value
-        data_points[key] = [x[1] for x in value]
+        data_points[key] = pairs[:, 1]
     return data_points
 
 
@@ -67,49 +130,88 @@ def prepend_new_row(df: pl.DataFrame, start: str) -> pl.DataFrame:
     return df
 
 
-def fill_date(df: pl.DataFrame):
+def fill_date(df: pl.DataFrame, every: str = '1d'):
     """Fill in missing date row with null values"""
     df = df.set_sorted('date')
-    df = df.upsample(time_column='date', every='1d')
+    df = df.upsample(time_column='date', every=every)
     return df
 
 
-def replace_zeros_with_nulls(df: pl.DataFrame, column: str) -> pl.DataFrame:
-    """Replace any zeros in the given column with null values"""
-    # Get the series from the dataframe
-    series = df[column]
-    # Apply a lambda function to replace zeros with nulls
-    series = series.apply(lambda x: None if x == 0 else x)
-    # Replace the column in the dataframe with the modified series
-    df = df.with_columns(series.alias(column))
-    return df
+def replace_zeros_with_nulls(df: pl.DataFrame, columns: str or list) -> pl.DataFrame:
+    """Replace any zeros in the given column or columns with null values"""
+    if isinstance(columns, str):
+        columns = [columns]
+    # Build one when/then expression per column and apply them together
+    return df.with_columns([
+        pl.when(pl.col(c) == 0).then(pl.lit(None)).otherwise(pl.col(c)).alias(c)
+        for c in columns
+    ])
 
 
-def create_df(name: str, currency: str, start: str, end: str) -> pl.DataFrame:
-    """Create Polars dataframe from API data"""
-    json = api_call(name, currency, start, end)
+def json_to_df(json: dict, start: str) -> pl.DataFrame:
+    """Create Polars dataframe from market chart JSON"""
     data = extract_json(json)
     df = pl.DataFrame(data)
-    # Apply lambda function to the timestamps column and create a date column
-    date_series = df['timestamps'].apply(lambda x: datetime.fromtimestamp(x/1000).date())
-    df = df.with_columns([date_series.alias('date')])
-    df = df.drop('timestamps')
-    # Reorder date column to the first position
-    df = df.select(['date', *df.columns[:-1]])
+    # Cast the epoch milliseconds to UTC dates and put the date column first
+    df = df.select([
+        pl.col('timestamps').cast(pl.Datetime('ms')).dt.date().alias('date'),
+        pl.exclude('timestamps')
+    ])
     # Prepend a new row if needed
     df = prepend_new_row(df, start)
     # Fill in any missing rows
     df = fill_date(df)
     # Replace any zeros with nulls in every column except date
-    for column in df.columns[1:]:
-        df = replace_zeros_with_nulls(df, column)
-    return df
+    return replace_zeros_with_nulls(df, df.columns[1:])
+
+
+def create_df(name: str, currency: str, start: str, end: str, base_url: str = API_URL) -> pl.DataFrame:
+    """Create Polars dataframe from API data"""
+    json = api_call(name, currency, start, end, base_url)
+    return json_to_df(json, start)
 
 
-def create_api_dict(symbols: list, ids: list, currency: str, start: str, end: str) -> dict:
+def create_api_dict(symbols: list, ids: list, currency: str, start: str, end: str,
+                    workers: int = 4, base_url: str = API_URL) -> dict:
     """Create a dictionary of Polars dataframes for each crypto id"""
-    crypto_dict = {}
-    for symbol, id in zip(symbols, ids):
-        df = create_df(id, currency, start, end)
-        crypto_dict[symbol] = df
-    return crypto_dict
\ No newline at end of file
+    # Fetch the ids concurrently, the shared rate limiter keeps the pace
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(create_df, id, currency, start, end, base_url) for id in ids]
+        crypto_dict = {symbol: future.result() for symbol, future in zip(symbols, futures)}
+    return crypto_dict
+
+
+def append_tail(df: pl.DataFrame, tail: pl.DataFrame) -> pl.DataFrame:
+    """Append the rows of tail dated after the last date in df"""
+    last = df['date'].max()
+    tail = tail.filter(pl.col('date') > last).select(df.columns)
+    # Keep the stored schema so the data store does not change dtypes
+    tail = tail.with_columns([pl.col(c).cast(t) for c, t in df.schema.items()])
+    return pl.concat([df, tail])
+
+
+def update_df(df: pl.DataFrame, name: str, currency: str, end: str, base_url: str = API_URL) -> pl.DataFrame:
+    """Fetch only the days missing after the last stored date and append them"""
+    last = df['date'].max()
+    end_date = datetime.strptime(end, '%Y/%m/%d').date()
+    if last >= end_date:
+        return df
+    # Start far enough back to keep daily granularity, the overlap is dropped when appending
+    start_date = min(last + timedelta(days=1), end_date - timedelta(days=DAILY_MIN_DAYS))
+    tail = create_df(name, currency, start_date.strftime('%Y/%m/%d'), end, base_url)
+    return append_tail(df, tail)
+
+
+def update_api_dict(data: dict, symbols: list, ids: list, currency: str, start: str, end: str,
+                    workers: int = 4, base_url: str = API_URL) -> dict:
+    """Update a dictionary of Polars dataframes with the missing tail of each crypto id"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for symbol, id in zip(symbols, ids):
+            if symbol in data:
+                futures.append(executor.submit(update_df, data[symbol], id, currency, end, base_url))
+            else:
+                # New symbols get the full range
+                futures.append(executor.submit(create_df, id, currency, start, end, base_url))
+        crypto_dict = {symbol: future.result() for symbol, future in zip(symbols, futures)}
+    return crypto_dict
@@ -0,0 +1,143 @@
+import warnings
+import numpy as np
+import polars as pl
+import pandas as pd
+from rfa_utils import general_fns as gf
+from rfa_utils.panel import Panel
+
+FEE_PAIRS = (('average_transaction_fees', '24h_volume'), ('average_transaction_fees', 'transactions_count'))
+WINDOWS = (30, 90, 365)
+
+
+def cumulative_sums(x: np.ndarray, y: np.ndarray) -> list:
+    """Return the cumulative count, sums, sums of squares and cross products over the last axis,
+    counting only positions where both x and y are present, with a leading zero"""
+    x, y = np.broadcast_arrays(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    with warnings.catch_warnings():
+        # All-NaN series only produce NaN correlations
+        warnings.simplefilter('ignore', RuntimeWarning)
+        # Centering each series keeps the cumulative sums small, correlations are shift invariant
+        x = np.where(valid, x - np.nanmean(x, axis=-1, keepdims=True), 0.0)
+        y = np.where(valid, y - np.nanmean(y, axis=-1, keepdims=True), 0.0)
+    zero = np.zeros(x.shape[:-1] + (1,))
+    return [np.concatenate([zero, np.cumsum(a, axis=-1)], axis=-1) for a in (valid.astype(float), x, y, x * x, y * y, x * y)]
+
+
+def window_sums(cum: np.ndarray, window: int) -> np.ndarray:
+    """Return the sums over the trailing window at every position from a cumulative sum with a leading zero"""
+    hi = np.arange(1, cum.shape[-1])
+    lo = np.maximum(hi - window, 0)
+    return cum[..., hi] - cum[..., lo]
+
+
+def windowed_corr(x: np.ndarray, y: np.ndarray, windows: tuple = WINDOWS, min_periods: int = None) -> dict:
+    """Return window -> rolling Pearson correlation of x and y over the last axis, for all leading axes at once.
+    Pairs with a missing value are skipped, windows with fewer than min_periods pairs (default the window) are NaN"""
+    sums = cumulative_sums(x, y)
+    result = {}
+    for window in windows:
+        n, sx, sy, sxx, syy, sxy = (window_sums(cum, window) for cum in sums)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            corr = (sxy - sx * sy / n) / np.sqrt(var_x * var_y)
+        # Constant windows are NaN like in pandas, allowing for rounding in the sums
+        flat = (var_x <= 1e-12 * sxx) | (var_y <= 1e-12 * syy)
+        corr[(n < max(window if min_periods is None else min_periods, 2)) | flat] = np.nan
+        result[window] = np.clip(corr, -1, 1)
+    return result
+
+
+def as_panel(dfs: dict) -> Panel:
+    """Return the dataframes as a Panel, unless they already are one"""
+    return dfs if isinstance(dfs, Panel) else Panel.from_dict(dfs)
+
+
+def rolling_corrs(dfs: dict, pairs: tuple = FEE_PAIRS, windows: tuple = WINDOWS, min_periods: int = None) -> dict:
+    """Return the rolling correlations of each column pair for every symbol and window, keyed like
+    'average_transaction_fees_vs_24h_volume_roll30', as date x symbol dataframes"""
+    panel = as_panel(dfs)
+    corrs = {}
+    for x, y in pairs:
+        if x not in panel.metrics or y not in panel.metrics:
+            continue
+        mask = panel.present[panel.metrics.index(x)] & panel.present[panel.metrics.index(y)]
+        symbols = [s for s, has in zip(panel.symbols, mask) if has]
+        for window, corr in windowed_corr(panel.array(x)[mask], panel.array(y)[mask], windows, min_periods).items():
+            corrs[f'{x}_vs_{y}_roll{window}'] = pd.DataFrame(corr.T, index=panel.dates, columns=symbols)
+    return corrs
+
+
+def cross_corrs(dfs: dict, metric: str = 'average_transaction_fees', windows: tuple = WINDOWS, min_periods: int = None) -> dict:
+    """Return the rolling correlations of a column between every pair of symbols, keyed like
+    'average_transaction_fees_cross_roll30', as long frames with date, symbol_a, symbol_b and corr columns"""
+    panel = as_panel(dfs)
+    mask = panel.present[panel.metrics.index(metric)]
+    symbols = [s for s, has in zip(panel.symbols, mask) if has]
+    values = panel.array(metric)[mask]
+    # Every symbol pair at once by broadcasting to (symbol, symbol, date)
+    n_sym, n_dates = len(symbols), len(panel.dates)
+    keys = {
+        'date': pl.Series(np.tile(panel.dates.values, n_sym * n_sym)).cast(pl.Date),
+        # Utf8 rather than Categorical, polars 0.18 cannot unpickle Categorical frames for the report workers
+        'symbol_a': pl.Series(np.repeat(symbols, n_sym * n_dates), dtype=pl.Utf8),
+        'symbol_b': pl.Series(np.tile(np.repeat(symbols, n_dates), n_sym), dtype=pl.Utf8)
+    }
+    corrs = {}
+    for window, corr in windowed_corr(values[:, None], values[None, :], windows, min_periods).items():
+        corrs[f'{metric}_cross_roll{window}'] = pl.DataFrame({**keys, 'corr': corr.ravel()}).with_columns(pl.col('corr').fill_nan(None))
+    return corrs
+
+
+def cross_matrix(cross_df: pl.DataFrame, date=None) -> pd.DataFrame:
+    """Return the symbol x symbol matrix of a cross correlation frame on a date, by default the last date with values"""
+    df = cross_df.drop_nulls('corr')
+    day = df['date'].max() if date is None else date
+    matrix = df.filter(pl.col('date') == day)
+    matrix = matrix.pivot(values='corr', index='symbol_a', columns='symbol_b', aggregate_function='first')
+    return matrix.to_pandas().set_index('symbol_a').rename_axis(index=None)
+
+
+def metric_corrs(dfs: dict) -> dict:
+    """Return the full sample correlation matrix of the columns of every symbol, like df.corr(), in one batched pass"""
+    panel = as_panel(dfs)
+    values = panel.values
+    # (metric, metric, symbol) matrices from the last position of a window spanning the whole sample
+    corr = windowed_corr(values[:, None], values[None, :], (len(panel.dates),), min_periods=2)[len(panel.dates)][..., -1]
+    corrs = {}
+    for j, symbol in enumerate(panel.symbols):
+        mask = panel.present[:, j]
+        cols = [m for m, has in zip(panel.metrics, mask) if has]
+        corrs[symbol] = pd.DataFrame(corr[mask][:, mask, j], index=pd.Index(cols, name='metric'), columns=cols)
+    return corrs
+
+
+def build_correlations(dfs: dict, pairs: tuple = FEE_PAIRS, metric: str = 'average_transaction_fees',
+                       windows: tuple = WINDOWS, min_periods: int = None) -> dict:
+    """Compute the rolling, cross-symbol and per-symbol correlations of a dataset, keyed by name"""
+    panel = as_panel(dfs)
+    corrs = rolling_corrs(panel, pairs, windows, min_periods)
+    if metric in panel.metrics:
+        corrs.update(cross_corrs(panel, metric, windows, min_periods))
+    corrs.update({f'corr_{symbol}': df for symbol, df in metric_corrs(panel).items()})
+    return corrs
+
+
+def save_correlations(path: str, corrs: dict) -> None:
+    """Write the correlations to the data store so the heatmap and report code can read them"""
+    gf.create_store(path, {name: df if isinstance(df, pl.DataFrame) else pl.from_pandas(df.reset_index()) for name, df in corrs.items()})
+
+
+def load_correlations(path: str, names: list = None) -> dict:
+    """Read correlations from the data store, rolling ones indexed by date and matrices by metric.
+    Cross-symbol correlations stay long polars frames, see cross_matrix"""
+    data = gf.import_store(path, names or gf.store_names(path))
+    corrs = {}
+    for name, df in data.items():
+        if 'symbol_a' in df.columns:
+            # Stores written before the symbols were Utf8 still hold Categorical columns
+            corrs[name] = df.with_columns(pl.col(['symbol_a', 'symbol_b']).cast(pl.Utf8))
+        else:
+            corrs[name] = df.to_pandas().set_index(df.columns[0])
+    return corrs
@@ -1,72 +1,114 @@
-import re
+import threading
+import requests
 import polars as pl
-from datetime import datetime, timedelta
+from time import sleep
+from typing import TYPE_CHECKING, Callable
+from datetime import datetime
 from urllib.parse import unquote
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+from rfa_utils.chart_parser import parse_chart
 
+# Selenium is imported by the functions that drive a browser, so importing the module stays cheap
+if TYPE_CHECKING:
+    from selenium import webdriver
 
-def scrape_source(url: str, driver: webdriver, start_date: str, end_date: str) -> str:
-    """Scrape token data from BitInfoCharts with headless Selenium"""
+URL_START = 'https://bitinfocharts.com/comparison/'
+URL_END = '.html#alltime'
+
+
+def headless_driver() -> 'webdriver.Chrome':
+    """Create a headless Chrome webdriver"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--disable-gpu')
+    return webdriver.Chrome(options=chrome_options)
+
+
+class HttpDriver:
+    """Minimal webdriver stand-in that loads pages over plain HTTP, e.g. from a local fixture server"""
+
+    def __init__(self, timeout: float = 30):
+        self.session = requests.Session()
+        self.timeout = timeout
+        self.page_source = ''
+
+    def get(self, url: str) -> None:
+        res = self.session.get(url, timeout=self.timeout)
+        res.raise_for_status()
+        self.page_source = res.text
+
+    def find_element(self, by: str, value: str) -> str:
+        # Only the chart container lookup used by WebDriverWait is supported
+        if f'id="{value}"' not in self.page_source:
+            from selenium.common.exceptions import NoSuchElementException
+            raise NoSuchElementException(f'No element with {by}={value}')
+        return value
+
+    def set_page_load_timeout(self, timeout: float) -> None:
+        self.timeout = timeout
+
+    def quit(self) -> None:
+        self.session.close()
+
+
+def scrape_source(url: str, driver: 'webdriver.Chrome', start_date: str, end_date: str, wait_time: float = 1) -> tuple:
+    """Scrape token data from BitInfoCharts with headless Selenium, return arrays of dates and values"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
     # Wait for the chart to load and get page source
     driver.get(url)
-    wait = WebDriverWait(driver, 1)
+    wait = WebDriverWait(driver, wait_time)
     wait.until(EC.presence_of_element_located((By.ID, 'container')))
-    html = driver.page_source
-    # Find the intended start and end dates using regex
-    start = re.search(rf'\[new Date\("{start_date}"\)', html, re.DOTALL)
-    end = re.search(rf'\[new Date\("{end_date}"\)[^\]]*', html, re.DOTALL)
-    # Use a try-except block to handle the case when end is None
-    try:
-        # Extract the graph data in between
-        graph_data = html[start.start():end.end() + 1]
-    except AttributeError:
-        # Use the last date found as the end index
-        end_str = re.findall(r'\[new Date\("[\d/]*"\)[^\]]*\]', html, re.DOTALL)[-1]
-        end = re.search(end_str, html, re.DOTALL)
-        graph_data = html[start.start():end.end() + 1]
-    return graph_data
-
-
-def extract_vals(stats: list, driver: webdriver, start: str, end: str) -> dict:
-    """Extract stat values from scraped page source into polars dataframe"""
-    url_start = 'https://bitinfocharts.com/comparison/'
-    url_end = '.html#alltime'
-    # Dict with empty list for each stat key
-    token_dict = {stat: [] for stat in stats}
+    # Parse the chart points between the intended start and end dates in one pass
+    return parse_chart(driver.page_source, start_date, end_date)
+
+
+def scrape_stat(stat: str, driver: 'webdriver.Chrome', start: str, end: str, base_url: str = URL_START,
+                wait_time: float = 1) -> tuple:
+    """Scrape the dates and values of a single stat page"""
+    full_url = unquote(base_url + stat + URL_END)  # Decode url with special chars
+    return scrape_source(full_url, driver, start, end, wait_time)
+
+
+def extract_vals(stats: list, driver: 'webdriver.Chrome', start: str, end: str, base_url: str = URL_START) -> dict:
+    """Extract stat dates and values from scraped page source"""
+    # Dict with the (dates, values) arrays for each stat key
+    token_dict = {}
     for stat in stats:
-        full_url = unquote(url_start + stat + url_end)  # Decode url with special chars
-        data = scrape_source(full_url, driver, start, end)
-        # Extract stat values from scraped data
-        pattern = r'new Date\("(.+?)"\),([\d.]+)'
-        matches = re.findall(pattern, data)
-        for match in matches:
-            token_dict[stat].append(float(match[1]))
+        token_dict[stat] = scrape_stat(stat, driver, start, end, base_url)
     return token_dict
 
 
 def create_dataframe(token_dict: dict, start: str, end: str) -> pl.DataFrame:
-    """Create polars dataframe with date column and token data"""
+    """Create polars dataframe with date column and token data aligned on the scraped dates"""
     start = datetime.strptime(start, '%Y/%m/%d').date()
     end = datetime.strptime(end, '%Y/%m/%d').date()
-    # Create separate dataframe for each stat, concat them and extend the shorter columns
-    df = pl.concat(
-        items=[pl.DataFrame({_name: _values})
-            for _name, _values in token_dict.items()],
-        how="horizontal",
-    )
-    # Create polars dataframe with date column
-    delta = end - start
-    dates = [start + timedelta(days=i) for i in range(delta.days + 1)]
-    df = df.with_columns(pl.Series("date", dates))
-    # Reorder date column to the first position
-    df = df.select(['date', *df.columns[:-1]])
-    return df
-
-
-def create_scrape_dict(token_stats: dict, driver: webdriver, start: str, end: str) -> dict:
+    # Stack every stat into one long frame of (date, stat, value)
+    long_df = pl.concat([
+        pl.DataFrame({
+            'date': pl.Series(dates.astype('datetime64[ms]')).cast(pl.Date),
+            'stat': pl.Series([stat] * len(values), dtype=pl.Utf8),
+            # Null chart points come through as NaN
+            'value': pl.Series(values, dtype=pl.Float64).fill_nan(None)
+        })
+        for stat, (dates, values) in token_dict.items()
+    ])
+    # Pivot aligns all stats on date at once, duplicated days keep the first point
+    wide_df = long_df.pivot(values='value', index='date', columns='stat', aggregate_function='first', sort_columns=False)
+    # Join onto the full date range so missing days become explicit nulls
+    dates = pl.DataFrame({'date': pl.date_range(start, end, interval='1d', eager=True)})
+    df = dates.join(wide_df, on='date', how='left')
+    # Keep the stats order, adding stats without any points as null columns
+    return df.select([
+        pl.col('date'),
+        *[pl.col(stat) if stat in df.columns else pl.lit(None, dtype=pl.Float64).alias(stat) for stat in token_dict]
+    ])
+
+
+def create_scrape_dict(token_stats: dict, driver: 'webdriver.Chrome', start: str, end: str) -> dict:
     """Create a dictionary of Polars dataframes for each crypto id"""
     # Build a dataframe for each token and its stats list
     token_dfs = {}
@@ -74,4 +116,74 @@ def create_scrape_dict(token_stats: dict, driver: webdriver, start: str, end: st
         token_dict = extract_vals(stats, driver, start, end)
         token_df = create_dataframe(token_dict, start, end)
         token_dfs[token] = token_df
-    return token_dfs
\ No newline at end of file
+    return token_dfs
+
+
+class DriverPool:
+    """Hand each worker thread its own webdriver and quit them all on exit"""
+
+    def __init__(self, driver_factory: Callable = headless_driver, timeout: float = 30):
+        self.driver_factory = driver_factory
+        self.timeout = timeout
+        self.local = threading.local()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def get(self) -> 'webdriver.Chrome':
+        if not hasattr(self.local, 'driver'):
+            driver = self.driver_factory()
+            driver.set_page_load_timeout(self.timeout)
+            self.local.driver = driver
+            with self.lock:
+                self.drivers.append(driver)
+        return self.local.driver
+
+    def reset(self) -> None:
+        """Replace the current thread's driver after a failure"""
+        driver = self.local.__dict__.pop('driver', None)
+        if driver is not None:
+            with self.lock:
+                self.drivers.remove(driver)
+            driver.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for driver in self.drivers:
+            driver.quit()
+
+
+def scrape_with_retry(pool: DriverPool, stat: str, start: str, end: str, base_url: str = URL_START,
+                      retries: int = 2, wait_time: float = 1) -> tuple:
+    """Scrape a stat page with the worker's driver, retrying with a fresh driver on failure"""
+    from selenium.common.exceptions import WebDriverException
+    for attempt in range(retries + 1):
+        try:
+            return scrape_stat(stat, pool.get(), start, end, base_url, wait_time)
+        except (WebDriverException, requests.RequestException):
+            # Timeouts get a new driver and a short backoff
+            pool.reset()
+            if attempt == retries:
+                raise
+            sleep(2 ** attempt)
+
+
+def create_scrape_dict_pool(token_stats: dict, start: str, end: str, workers: int = 4,
+                            driver_factory: Callable = headless_driver, base_url: str = URL_START,
+                            retries: int = 2, timeout: float = 30, wait_time: float = 1) -> dict:
+    """Create a dictionary of Polars dataframes for each crypto id, scraping stat pages on a pool of drivers"""
+    with DriverPool(driver_factory, timeout) as pool, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            token: {
+                stat: executor.submit(scrape_with_retry, pool, stat, start, end, base_url, retries, wait_time)
+                for stat in stats
+            }
+            for token, stats in token_stats.items()
+        }
+        # Merge the stat dates and values back into the same per-token frames
+        token_dfs = {}
+        for token, stat_futures in futures.items():
+            token_dict = {stat: future.result() for stat, future in stat_futures.items()}
+            token_dfs[token] = create_dataframe(token_dict, start, end)
+    return token_dfs
@@ -0,0 +1,73 @@
+import polars as pl
+import pandas as pd
+from rfa_utils import general_fns as gf
+
+SERIES_COLS = ['fee_percentage', 'transaction_fees', '24h_volume']
+
+
+def date_indexed(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the pandas dataframe indexed by its date column, if it still has one, converting polars dataframes"""
+    if isinstance(df, pl.DataFrame):
+        df = df.to_pandas()
+    if 'date' in df.columns:
+        df = df.set_index('date')
+    df.index = pd.DatetimeIndex(df.index, name='date')
+    return df
+
+
+def wide_panel(dfs: dict, columns: list) -> pd.DataFrame:
+    """Align the given columns of every dataframe on date, with (column, symbol) column labels"""
+    series = {}
+    for name, df in dfs.items():
+        df = date_indexed(df)
+        # Fee percentage is derived from the average fees and values when missing
+        if 'fee_percentage' not in df.columns and {'average_transaction_fees', 'average_transaction_value'} <= set(df.columns):
+            df = df.assign(fee_percentage=df['average_transaction_fees'] / df['average_transaction_value'] * 100)
+        for col in columns:
+            if col in df.columns:
+                series[(col, name)] = df[col]
+    panel = pd.concat(series, axis=1)
+    panel.columns.names = ['column', 'symbol']
+    return panel
+
+
+def build_features(dfs: dict, columns: list = SERIES_COLS, windows: tuple = (4,), weight_col: str = '24h_volume') -> dict:
+    """Compute the daily, weekly and rolling series of every symbol in one pass over a wide panel.
+    Returns a dict of date x symbol dataframes keyed by feature name"""
+    panel = wide_panel(dfs, columns)
+    # Resample every column of every symbol at once
+    weekly_median = panel.resample('W').median()
+    weekly_mean = panel.resample('W').mean()
+    features = {}
+    for col in panel.columns.unique('column'):
+        features[col] = panel[col]
+        features[f'{col}_weekly_median'] = weekly_median[col]
+        features[f'{col}_weekly_mean'] = weekly_mean[col]
+        for window in windows:
+            features[f'{col}_weekly_median_roll{window}'] = weekly_median[col].rolling(window, min_periods=1).mean()
+    # Volume weighted fee percentage across symbols
+    if 'fee_percentage' in features and weight_col in features:
+        fees, weights = features['fee_percentage'].align(features[weight_col], join='inner')
+        weights = weights.where(fees.notna())
+        weighted = ((fees * weights).sum(axis=1) / weights.sum(axis=1)).to_frame('weighted')
+        features['fee_percentage_volume_weighted'] = weighted
+        features['fee_percentage_volume_weighted_weekly_mean'] = weighted.resample('W').mean()
+    return features
+
+
+def save_features(path: str, features: dict) -> None:
+    """Write the feature series to the data store so plots can read them without recomputing"""
+    gf.create_store(path, {name: pl.from_pandas(df.reset_index()) for name, df in features.items()})
+
+
+def load_features(path: str, names: list = None) -> dict:
+    """Read feature series from the data store, indexed by date"""
+    data = gf.import_store(path, names or gf.store_names(path))
+    return {name: df.to_pandas().set_index('date') for name, df in data.items()}
+
+
+def stored_features(path: str, dfs: dict, **options) -> dict:
+    """Read the feature series written by the features stages, building them from the dataframes if it has not run"""
+    if gf.store_exists(path):
+        return load_features(path)
+    return build_features(dfs, **options)
@@ -1,11 +1,14 @@
 import os
-import xlsxwriter
 import polars as pl
 from typing import Any, Callable
 
+# Columnar formats for the data store, keyed by name with the file extension
+STORE_FORMATS = {'parquet': '.parquet', 'ipc': '.arrow'}
+
 
 def create_excel(path: str, data: dict or pl.DataFrame):
     """Creates an Excel file with dict of dataframes or a single dataframe"""
+    import xlsxwriter
     with xlsxwriter.Workbook(path) as workbook:
         # Check if the data is a dict or a dataframe
         if isinstance(data, dict):
@@ -19,27 +22,121 @@ def create_excel(path: str, data: dict or pl.DataFrame):
         else:
             # Raise an error if the data is not a dict or a dataframe
             raise TypeError("Data must be a dictionary of Polars dataframes or a single Polars dataframe.")
-        
 
-def import_excel(path: str, names: list):
-    """Create dict of dataframes from Excel sheets"""
+
+def import_excel(path: str, names: list = None):
+    """Create dict of dataframes from Excel sheets, every sheet if no names are given"""
+    read_csv_options = {
+        'infer_schema_length': 2000,
+        'try_parse_dates': True
+    }
+    if names is None:
+        # Sheet id 0 reads every sheet into a dict keyed by sheet name
+        return pl.read_excel(path, sheet_id=0, read_csv_options=read_csv_options)
+    data = {}
+    for name in names:
+        data[name] = pl.read_excel(path, sheet_name=name, read_csv_options=read_csv_options)
+    return data
+
+
+def store_path(path: str) -> str:
+    """Return the data store directory for a dataset path, dropping any file extension"""
+    root, _ = os.path.splitext(path)
+    return root
+
+
+def sheet_path(path: str, name: str, fmt: str = 'parquet') -> str:
+    """Return the file path of a single sheet inside the data store"""
+    if fmt not in STORE_FORMATS:
+        raise ValueError(f"Format must be one of {list(STORE_FORMATS)}, got '{fmt}'.")
+    return os.path.join(store_path(path), name + STORE_FORMATS[fmt])
+
+
+def store_exists(path: str) -> bool:
+    """Check if a data store has been written for the dataset path"""
+    return os.path.isdir(store_path(path))
+
+
+def store_names(path: str, fmt: str = 'parquet') -> list:
+    """List the sheet names kept in the data store"""
+    ext = STORE_FORMATS[fmt]
+    files = sorted(os.listdir(store_path(path)))
+    return [f[:-len(ext)] for f in files if f.endswith(ext)]
+
+
+def create_store(path: str, data: dict or pl.DataFrame, fmt: str = 'parquet') -> None:
+    """Write dict of dataframes or a single dataframe to the data store, one file per sheet"""
+    # Single dataframes are stored under the default sheet name used by Excel
+    if isinstance(data, pl.DataFrame):
+        data = {'Sheet1': data}
+    elif not isinstance(data, dict):
+        raise TypeError("Data must be a dictionary of Polars dataframes or a single Polars dataframe.")
+    os.makedirs(store_path(path), exist_ok=True)
+    for name, df in data.items():
+        if fmt == 'parquet':
+            df.write_parquet(sheet_path(path, name, fmt))
+        else:
+            df.write_ipc(sheet_path(path, name, fmt))
+
+
+def import_store(path: str, names: list, fmt: str = 'parquet', memory_map: bool = True) -> dict:
+    """Create dict of dataframes from data store sheets, keeping the stored schema"""
     data = {}
     for name in names:
-        data[name] = pl.read_excel(
-            path, 
-            sheet_name=name,
-            read_csv_options={
-                'infer_schema_length': 2000,
-                'try_parse_dates': True
-            }
-        )
+        if fmt == 'parquet':
+            data[name] = pl.read_parquet(sheet_path(path, name, fmt), memory_map=memory_map)
+        else:
+            data[name] = pl.read_ipc(sheet_path(path, name, fmt), memory_map=memory_map)
     return data
 
 
-def check_and_create(file_path: str, create_dict_fn: Callable, *args: Any) -> None:
-    # Check if file already exists
-    if not os.path.exists(file_path):
+def scan_store(path: str, names: list, fmt: str = 'parquet') -> dict:
+    """Create dict of lazy frames from data store sheets"""
+    data = {}
+    for name in names:
+        if fmt == 'parquet':
+            data[name] = pl.scan_parquet(sheet_path(path, name, fmt))
+        else:
+            data[name] = pl.scan_ipc(sheet_path(path, name, fmt))
+    return data
+
+
+def import_data(path: str, names: list, fmt: str = 'parquet', lazy: bool = False) -> dict:
+    """Create dict of dataframes from the data store, falling back to the Excel file if there is no store"""
+    if store_exists(path):
+        if lazy:
+            return scan_store(path, names, fmt)
+        return import_store(path, names, fmt)
+    data = import_excel(path, names)
+    if lazy:
+        return {name: df.lazy() for name, df in data.items()}
+    return data
+
+
+def check_and_create(file_path: str, create_dict_fn: Callable, *args: Any, fmt: str = 'parquet', export: bool = False) -> None:
+    """Create the dataset with the given function if it is not in the data store yet, optionally exporting to Excel"""
+    # Check if the data store or the legacy Excel file already exists
+    if not store_exists(file_path) and not os.path.exists(file_path):
         # Call the function to create dict of dataframes
         data_dict = create_dict_fn(*args)
-        # Create Excel file with data
-        create_excel(file_path, data_dict)
\ No newline at end of file
+        # Write to the data store and only export Excel when asked
+        create_store(file_path, data_dict, fmt)
+        if export:
+            create_excel(file_path, data_dict)
+
+
+def check_and_update(file_path: str, create_dict_fn: Callable, update_dict_fn: Callable, *args: Any, fmt: str = 'parquet') -> None:
+    """Create the dataset if it is not in the data store, else append only the rows missing from it.
+    A legacy Excel file without a data store is imported and updated into the data store"""
+    if store_exists(file_path):
+        data = import_store(file_path, store_names(file_path, fmt), fmt, memory_map=False)
+    elif os.path.exists(file_path):
+        data = import_excel(file_path)
+    else:
+        check_and_create(file_path, create_dict_fn, *args, fmt=fmt)
+        return
+    # Single dataframes are stored under the default sheet name
+    if list(data) == ['Sheet1']:
+        data = data['Sheet1']
+    # The update function takes the stored data followed by the create arguments
+    create_store(file_path, update_dict_fn(data, *args), fmt)
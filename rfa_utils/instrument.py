@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import functools
+import importlib
+import threading
+import tracemalloc
+from typing import Any, Callable
+from collections.abc import Mapping
+
+# Heavy entry points wrapped by instrument_package, small helpers are left alone so they are not logged on every call
+ENTRY_POINTS = {
+    'rfa_utils.general_fns': ['import_excel', 'import_store', 'create_store', 'create_excel'],
+    'rfa_utils.coingecko_api': ['create_api_dict', 'update_api_dict', 'create_df', 'update_df'],
+    'rfa_utils.owlracle_api': ['api_call', 'create_df', 'update_df'],
+    'rfa_utils.crypto_scrape': ['scrape_source', 'create_scrape_dict', 'create_scrape_dict_pool'],
+    'rfa_utils.clean_crypto': ['winsorize_df', 'merge_api_scraped', 'impute_dfs'],
+    'rfa_utils.features': ['build_features', 'save_features', 'load_features'],
+    'rfa_utils.correlation': ['build_correlations', 'save_correlations', 'load_correlations'],
+    'rfa_utils.remittance_cube': ['build_facts', 'build_aggregates', 'cube_pivot'],
+    'rfa_utils.wb_ingest': ['ingest'],
+    'rfa_utils.panel': ['Panel.from_dict'],
+    'rfa_ana.analysis': ['crypto_fees_scenarios', 'stablecoin_fees_scenarios', 'predict_remittance_cost'],
+    'rfa_ana.simulation': ['cost_methods', 'simulate_costs']
+}
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def count_rows(obj: Any) -> int or None:
+    """Return the number of rows in a dataframe or a mapping/list of dataframes (e.g. a Panel), None for anything else"""
+    if hasattr(obj, 'shape') and hasattr(obj, 'columns'):
+        return obj.shape[0]
+    if isinstance(obj, Mapping):
+        # Items by key, Panel.values is its array
+        counts = [count_rows(obj[k]) for k in obj]
+    elif isinstance(obj, (list, tuple)):
+        counts = [count_rows(v) for v in obj]
+    else:
+        return None
+    counts = [c for c in counts if c is not None]
+    return sum(counts) if counts else None
+
+
+def peak_rss_mb() -> float or None:
+    """Return the peak resident set size of the process in MB"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def emit(record: dict, log_path: str = None) -> None:
+    """Write a metrics record as a JSON line to the log file, or to stderr"""
+    line = json.dumps(record, default=str)
+    with _lock:
+        if log_path:
+            with open(log_path, 'a') as f:
+                f.write(line + '\n')
+        else:
+            print(line, file=sys.stderr)
+
+
+def instrument(fn: Callable, log_path: str = None, profile_dir: str = None, trace_memory: bool = False) -> Callable:
+    """Wrap a function to record wall time, CPU time, peak memory and input/output rows of every call.
+    tracemalloc and the RSS are process-wide, so when rfa.dag runs stages on threads
+    the memory numbers of concurrent calls include each other's allocations"""
+    name = f'{fn.__module__}.{fn.__qualname__}'
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_local, 'depth', 0)
+        _local.depth = depth + 1
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if trace_memory:
+            peaks = _local.__dict__.setdefault('peaks', [])
+            # Resetting the peak would lose the caller's peak so far, it is carried on the stack
+            if peaks:
+                peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            peaks.append(0)
+        # Only outermost calls are profiled, nested profilers would replace each other
+        profiler = cProfile.Profile() if profile_dir and depth == 0 else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        error, result = None, None
+        try:
+            if profiler:
+                result = profiler.runcall(fn, *args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            _local.depth = depth
+            record = {
+                'ts': time.time(),
+                'fn': name,
+                'depth': depth,
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': time.process_time() - cpu,
+                'peak_rss_mb': peak_rss_mb(),
+                'rows_in': count_rows([args, kwargs]),
+                'rows_out': count_rows(result),
+                'error': error
+            }
+            if trace_memory:
+                peak = max(_local.peaks.pop(), tracemalloc.get_traced_memory()[1])
+                # The caller's peak includes this call's
+                if _local.peaks:
+                    _local.peaks[-1] = max(_local.peaks[-1], peak)
+                record['peak_traced_mb'] = peak / 1024 ** 2
+            if profiler:
+                os.makedirs(profile_dir, exist_ok=True)
+                record['profile'] = os.path.join(profile_dir, f'{name}-{int(record["ts"] * 1000)}.prof')
+                profiler.dump_stats(record['profile'])
+            emit(record, log_path)
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument_attr(module: Any, path: str, **options) -> None:
+    """Replace a function of a module, or a method such as 'Panel.from_dict', with an instrumented wrapper"""
+    *parents, attr = path.split('.')
+    owner = module
+    for parent in parents:
+        owner = getattr(owner, parent)
+    value = vars(owner)[attr]
+    if isinstance(value, (classmethod, staticmethod)):
+        if not getattr(value.__func__, 'instrumented', False):
+            setattr(owner, attr, type(value)(instrument(value.__func__, **options)))
+    elif not getattr(value, 'instrumented', False):
+        setattr(owner, attr, instrument(value, **options))
+
+
+def instrument_stages(stages: dict, **options) -> None:
+    """Replace the build functions of pipeline stages in place with instrumented wrappers"""
+    for name, stage in stages.items():
+        if not getattr(stage.build, 'instrumented', False):
+            stages[name] = stage._replace(build=instrument(stage.build, **options))
+
+
+def instrument_package(entry_points: dict = ENTRY_POINTS, stages: dict = None, **options) -> None:
+    """Instrument the heavy entry points of the rfa_utils and rfa_ana modules, and the given pipeline stages.
+    Modules that import these functions by name keep the original, so call this before importing them"""
+    for name, paths in entry_points.items():
+        module = importlib.import_module(name)
+        for path in paths:
+            instrument_attr(module, path, **options)
+    if stages is not None:
+        instrument_stages(stages, **options)
@@ -1,12 +1,22 @@
 import os
-import requests
+import numpy as np
 import polars as pl
-from dotenv import load_dotenv
 from datetime import datetime, timezone
-from rfa_utils.coingecko_api import fill_date
+from concurrent.futures import ThreadPoolExecutor
+from rfa_utils.coingecko_api import RateLimiter, get_json, fill_date, append_tail
 
-# Load environment variables from .env file
-load_dotenv(".env")
+API_URL = 'https://api.owlracle.info/v4/eth/history'
+MAX_CANDLES = 1000  # Most candles returned by a single history call
+# Candle length in seconds and upsampling interval for each supported timeframe
+TIMEFRAMES = {
+    '10m': (600, '10m'),
+    '30m': (1800, '30m'),
+    '1h': (3600, '1h'),
+    '4h': (14400, '4h'),
+    '1d': (86400, '1d')
+}
+limiter = RateLimiter(rate=1, capacity=4)
+_env_loaded = False
 
 
 def unix_time(date: str) -> float:
@@ -42,57 +52,112 @@ def dates_between(start: str, end: str) -> list:
     return [date.strftime('%Y/%m/%d') + ' 00:00:00' for date in date_list]
 
 
-def api_call(dates_list: list) -> dict:
-    """Make a call to the Owlracle API and return historical gas JSON"""
-    key = os.getenv('OAPI')
-    results = {}    # Dict of JSON
+def span_windows(unix_start: int, unix_end: int, timeframe: str = '1d') -> list:
+    """Split a UNIX time span into (from, to) windows of at most MAX_CANDLES candles"""
+    seconds, _ = TIMEFRAMES[timeframe]
+    return [
+        (window_start, min(window_start + seconds * MAX_CANDLES, unix_end))
+        for window_start in range(unix_start, unix_end, seconds * MAX_CANDLES)
+    ]
 
-    # Loop over the list of dates in pairs using zip
+
+def time_windows(dates_list: list, timeframe: str = '1d') -> list:
+    """Split consecutive dates into (from, to) UNIX windows of at most MAX_CANDLES candles"""
+    windows = []
     for start_date, end_date in zip(dates_list, dates_list[1:]):
-        unix_start = unix_time(start_date)
-        unix_end = unix_time(end_date)
-    
-        # Make the API call with the start and end dates
-        res = requests.get(f'https://api.owlracle.info/v4/eth/history?apikey={key}&from={unix_start}&to={unix_end}&candles=365&timeframe=1d&txfee=true')
-        # Add the response JSON to the results dictionary with the year as the key
-        year = datetime.strptime(start_date, '%Y/%m/%d %H:%M:%S').year
-        results[year] = res.json()
-        
-    return results
+        windows.extend(span_windows(unix_time(start_date), unix_time(end_date), timeframe))
+    return windows
+
+
+def api_key() -> str:
+    """Return the Owlracle API key, loading the .env file on first use"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(".env")
+        _env_loaded = True
+    return os.getenv('OAPI')
+
+
+def fetch_window(window: tuple, timeframe: str = '1d', base_url: str = API_URL) -> dict:
+    """Fetch the candles of one window from the Owlracle API"""
+    unix_start, unix_end = window
+    seconds, _ = TIMEFRAMES[timeframe]
+    params = {
+        'apikey': api_key(),
+        'from': unix_start,
+        'to': unix_end,
+        'candles': min(MAX_CANDLES, (unix_end - unix_start) // seconds),
+        'timeframe': timeframe,
+        'txfee': 'true'
+    }
+    return get_json(base_url, params, rate_limiter=limiter)
+
+
+def api_call(dates_list: list, timeframe: str = '1d', workers: int = 4, base_url: str = API_URL) -> dict:
+    """Make concurrent calls to the Owlracle API and return historical gas JSON keyed by window"""
+    return fetch_windows(time_windows(dates_list, timeframe), timeframe, workers, base_url)
+
+
+def fetch_windows(windows: list, timeframe: str = '1d', workers: int = 4, base_url: str = API_URL) -> dict:
+    """Fetch the given windows concurrently and return historical gas JSON keyed by window"""
+    # Windows are fetched concurrently over the shared session, with retries on 429/5xx
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch_window, window, timeframe, base_url) for window in windows]
+        return {window: future.result() for window, future in zip(windows, futures)}
 
 
 def extract_json(json_data: dict) -> dict:
-    """Extract the txFee and the gasPrice from the JSON data, calculate the average
-    Return a dict containing three lists: dates, transaction_fees, and gas_prices"""
-    result = {}
-    dates = []
-    transaction_fees = []
-    gas_prices = []
-    for year, data in json_data.items():
-        for candle in data['candles']:
-            # Extract closing txFee and gasPrice from candles
-            fee = candle['txFee']['close']
-            price = candle['gasPrice']['close']
-            
-            # Only add in data from the current year
-            date = candle['timestamp'].split('T')[0]
-            if date.startswith(str(year)):
-                dates.append(date)
-                transaction_fees.append(fee)
-                gas_prices.append(price)
-        
-    # Add the sorted dates, fees, and prices lists to the result dict
-    result["date"] = sorted([datetime.strptime(date, '%Y-%m-%d').date() for date in dates])
-    result["transaction_fees"] = [x for _, x in sorted(zip(dates, transaction_fees))]
-    result["gas_prices"] = [x for _, x in sorted(zip(dates, gas_prices))]
-    
-    return result
+    """Extract the closing txFee and gasPrice of every candle into arrays sorted by timestamp
+    Return a dict containing three arrays: date, transaction_fees, and gas_prices"""
+    timestamps, transaction_fees, gas_prices = [], [], []
+    for (unix_start, unix_end), data in json_data.items():
+        candles = data['candles']
+        # Keep the window bounds with each batch, windows can return neighbouring candles
+        stamps = np.array([candle['timestamp'][:19] for candle in candles], dtype='datetime64[s]')
+        keep = (stamps >= np.datetime64(unix_start, 's')) & (stamps < np.datetime64(unix_end, 's'))
+        timestamps.append(stamps[keep])
+        transaction_fees.append(np.array([candle['txFee']['close'] for candle in candles], dtype=np.float64)[keep])
+        gas_prices.append(np.array([candle['gasPrice']['close'] for candle in candles], dtype=np.float64)[keep])
+    if not timestamps:
+        timestamps, transaction_fees, gas_prices = [np.array([], dtype='datetime64[s]')], [np.array([])], [np.array([])]
+    # One vectorized sort that also drops candles repeated across windows
+    stamps, order = np.unique(np.concatenate(timestamps), return_index=True)
+    return {
+        'date': stamps.astype('datetime64[ms]'),
+        'transaction_fees': np.concatenate(transaction_fees)[order],
+        'gas_prices': np.concatenate(gas_prices)[order]
+    }
+
 
+def json_to_df(json: dict, timeframe: str = '1d') -> pl.DataFrame:
+    """Create a Polars DataFrame of the candles in the Owlracle JSON"""
+    df = pl.DataFrame(extract_json(json))
+    # Daily candles keep a date column, finer timeframes keep the timestamp
+    df = df.with_columns(pl.col('date').cast(pl.Datetime('ms')))
+    if timeframe == '1d':
+        df = df.with_columns(pl.col('date').dt.date())
+    return df
 
-def create_df(start: str, end: str) -> pl.DataFrame:
+
+def create_df(start: str, end: str, timeframe: str = '1d', base_url: str = API_URL) -> pl.DataFrame:
     """Create a Polars DataFrame from the Owlracle API data between the given start and end dates"""
     between = dates_between(start, end)
-    json = api_call(between)
-    extracted = extract_json(json)
-    df = pl.DataFrame(extracted)
-    return fill_date(df)
\ No newline at end of file
+    json = api_call(between, timeframe, base_url=base_url)
+    return fill_date(json_to_df(json, timeframe), TIMEFRAMES[timeframe][1])
+
+
+def update_df(df: pl.DataFrame, start: str, end: str, timeframe: str = '1d', base_url: str = API_URL) -> pl.DataFrame:
+    """Fetch only the candles after the last stored timestamp up to the end date from the Owlracle API and append them.
+    An empty dataframe is created from the start date"""
+    if df.is_empty():
+        return create_df(start, end, timeframe, base_url)
+    seconds, every = TIMEFRAMES[timeframe]
+    last = df.select(pl.col('date').cast(pl.Datetime('ms')).max()).item()
+    unix_start = int(last.replace(tzinfo=timezone.utc).timestamp()) + seconds
+    # The end date is included up to its last candle
+    unix_end = unix_time(f'{end} 00:00:00') + 86400
+    if unix_start >= unix_end:
+        return df
+    json = fetch_windows(span_windows(unix_start, unix_end, timeframe), timeframe, base_url=base_url)
+    return fill_date(append_tail(df, json_to_df(json, timeframe)), every)
@@ -0,0 +1,116 @@
+import numpy as np
+import polars as pl
+import pandas as pd
+from collections.abc import Mapping
+from rfa_utils import general_fns as gf
+from rfa_utils.features import date_indexed
+
+
+class Panel(Mapping):
+    """Array-backed (metric x symbol x date) store with a shared date index.
+    Reads like a read-only dict of date-indexed pandas dataframes, change the values with assign"""
+
+    def __init__(self, values: np.ndarray, metrics: list, symbols: list, dates: pd.DatetimeIndex, present: np.ndarray = None):
+        self.values = values
+        self.metrics = list(metrics)
+        self.symbols = list(symbols)
+        self.dates = pd.DatetimeIndex(dates, name='date')
+        # Which metrics every symbol has, missing ones are left out of its dataframe
+        self.present = np.ones((len(self.metrics), len(self.symbols)), dtype=bool) if present is None else present
+
+    @classmethod
+    def from_dict(cls, dfs: dict, metrics: list = None, dtype: type = np.float64) -> 'Panel':
+        """Create a panel from a dict of polars or pandas dataframes, aligned on the union of their dates"""
+        frames = {}
+        for name, df in dfs.items():
+            if isinstance(df, pl.DataFrame):
+                df = df.to_pandas()
+            frames[name] = date_indexed(df)
+        if metrics is None:
+            metrics = []
+            for df in frames.values():
+                metrics += [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and c not in metrics]
+        dates = frames[next(iter(frames))].index if frames else pd.DatetimeIndex([])
+        for df in frames.values():
+            dates = dates.union(df.index)
+        values = np.full((len(metrics), len(frames), len(dates)), np.nan, dtype=dtype)
+        present = np.zeros((len(metrics), len(frames)), dtype=bool)
+        for j, df in enumerate(frames.values()):
+            pos = dates.get_indexer(df.index)
+            for i, col in enumerate(metrics):
+                if col in df.columns:
+                    values[i, j, pos] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+                    present[i, j] = True
+        return cls(values, metrics, list(frames), dates, present)
+
+    @classmethod
+    def from_store(cls, path: str, names: list, metrics: list = None, dtype: type = np.float64, fmt: str = 'parquet') -> 'Panel':
+        """Create a panel from the sheets of a dataset in the data store, or its Excel fallback"""
+        return cls.from_dict(gf.import_data(path, names, fmt), metrics, dtype)
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        """Return the dataframe of a symbol with the metrics it has.
+        It is a zero-copy view when the symbol has every metric and a copy otherwise, so its values are read-only
+        either way: writing to them raises and columns set on the dataframe are not kept in the panel"""
+        j = self.symbols.index(symbol)
+        mask = self.present[:, j]
+        if mask.all():
+            values, cols = self.values[:, j, :].view(), self.metrics
+        else:
+            values, cols = self.values[mask, j, :], [m for m, has in zip(self.metrics, mask) if has]
+        values.flags.writeable = False
+        return pd.DataFrame(values.T, index=self.dates, columns=cols, copy=False)
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def astype(self, dtype: type) -> 'Panel':
+        """Return the panel with values cast to dtype, e.g. np.float32 to halve memory"""
+        return Panel(self.values.astype(dtype, copy=False), self.metrics, self.symbols, self.dates, self.present)
+
+    def array(self, metric: str) -> np.ndarray:
+        """Return the symbol x date array of a metric as a view"""
+        return self.values[self.metrics.index(metric)]
+
+    def metric(self, metric: str) -> pd.DataFrame:
+        """Return a date x symbol dataframe of a metric for the symbols that have it"""
+        i = self.metrics.index(metric)
+        mask = self.present[i]
+        if mask.all():
+            return pd.DataFrame(self.values[i].T, index=self.dates, columns=self.symbols, copy=False)
+        return pd.DataFrame(self.values[i, mask].T, index=self.dates, columns=[s for s, has in zip(self.symbols, mask) if has])
+
+    def select(self, symbols: list) -> 'Panel':
+        """Return a panel with only the given symbols"""
+        idx = [self.symbols.index(s) for s in symbols]
+        return Panel(self.values[:, idx], self.metrics, symbols, self.dates, self.present[:, idx])
+
+    def assign(self, metric: str, values: np.ndarray, present: np.ndarray = None) -> 'Panel':
+        """Add a symbol x date array as a metric, an existing metric is overwritten in place"""
+        values = np.asarray(values, dtype=self.values.dtype)
+        present = np.ones(len(self.symbols), dtype=bool) if present is None else present
+        if metric in self.metrics:
+            i = self.metrics.index(metric)
+            self.values[i] = values
+            self.present[i] = present
+            return self
+        return Panel(np.concatenate([self.values, values[None]]), [*self.metrics, metric], self.symbols, self.dates,
+                     np.vstack([self.present, present]))
+
+    def to_long(self) -> pl.DataFrame:
+        """Return a long polars frame with a categorical symbol column, a date column and one column per metric"""
+        n_dates = len(self.dates)
+        data = {
+            'symbol': pl.Series(np.repeat(self.symbols, n_dates)).cast(pl.Categorical),
+            'date': pl.Series(np.tile(self.dates.values, len(self.symbols))).cast(pl.Date)
+        }
+        for i, metric in enumerate(self.metrics):
+            data[metric] = self.values[i].ravel()
+        return pl.DataFrame(data).with_columns(pl.col(self.metrics).fill_nan(None))
@@ -0,0 +1,92 @@
+import polars as pl
+from typing import TYPE_CHECKING
+from rfa_utils import general_fns as gf
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Sheet names of the remittance workbook for each dataset
+DATASETS = {
+    'cost_to': 'cost-to-country',
+    'cost_from': 'cost-from-country',
+    'inflow': 'inflows',
+    'outflow': 'outflows'
+}
+# Flow used to weight each cost dataset, money received for costs to a country and sent for costs from it
+WEIGHTS = {'cost_to': 'inflow', 'cost_from': 'outflow'}
+DIMENSIONS = ['Income', 'Region', 'year']
+
+
+def melt_sheet(df: pl.DataFrame, dataset: str) -> pl.DataFrame:
+    """Unpivot a wide sheet with one column per year into (Country Code, year, dataset value)"""
+    long_df = df.melt(id_vars='Country Code', variable_name='year', value_name=dataset)
+    return long_df.with_columns([
+        pl.col('year').cast(pl.Int16),
+        pl.col(dataset).cast(pl.Float64)
+    ])
+
+
+def build_facts(remit: dict) -> pl.DataFrame:
+    """Create the country x year fact table with every dataset as a column and the lookup dimensions"""
+    facts = None
+    for dataset, sheet in DATASETS.items():
+        long_df = melt_sheet(remit[sheet], dataset)
+        facts = long_df if facts is None else facts.join(long_df, on=['Country Code', 'year'], how='outer')
+    # Only countries in the lookup get an income and region, as in merge_lookup
+    lookup = remit['country-lookup'].select([
+        pl.col('Country Code'),
+        pl.col('Region').cast(pl.Categorical),
+        pl.col('Income').cast(pl.Categorical)
+    ])
+    return facts.join(lookup, on='Country Code', how='inner').sort(['Country Code', 'year'])
+
+
+def build_aggregates(facts: pl.DataFrame) -> pl.DataFrame:
+    """Pre-aggregate sums and counts at the income x region x year grain, with flow weighted cost sums"""
+    exprs = []
+    for dataset in DATASETS:
+        # count() includes nulls in polars 0.18, only observed values are counted
+        exprs += [pl.col(dataset).sum().alias(f'sum_{dataset}'), pl.col(dataset).is_not_null().sum().alias(f'n_{dataset}')]
+    for cost, flow in WEIGHTS.items():
+        # Weighted sums only count countries with both the cost and the flow
+        both = pl.col(cost).is_not_null() & pl.col(flow).is_not_null()
+        exprs += [
+            (pl.col(cost) * pl.col(flow)).filter(both).sum().alias(f'wsum_{cost}'),
+            pl.col(flow).filter(both).sum().alias(f'w_{cost}')
+        ]
+    return facts.groupby(DIMENSIONS).agg(exprs).sort(DIMENSIONS)
+
+
+def create_cube(path: str, remit: dict) -> None:
+    """Build the fact table and aggregates once from the remittance sheets and write them to the data store"""
+    facts = build_facts(remit)
+    gf.create_store(path, {'facts': facts, 'aggregates': build_aggregates(facts)})
+
+
+def import_cube(path: str) -> dict:
+    """Read the fact table and aggregates from the data store"""
+    return gf.import_store(path, ['facts', 'aggregates'])
+
+
+def cube_pivot(cube: dict, dataset: str, group: str, weighted: bool = False, years: tuple = None,
+               filters: dict = None) -> 'pd.DataFrame':
+    """Return the average of a dataset by income or region for each year, rolled up from the aggregates.
+    Weighted averages weight costs by the flow volume, filters slice the other dimension (e.g. {'Region': ...})"""
+    agg = cube['aggregates'].lazy()
+    for dim, value in (filters or {}).items():
+        agg = agg.filter(pl.col(dim).cast(pl.Utf8) == value)
+    if years is not None:
+        agg = agg.filter(pl.col('year').is_between(years[0], years[1]))
+    if weighted:
+        if dataset not in WEIGHTS:
+            raise ValueError(f"Weighted averages are only available for {list(WEIGHTS)}, got '{dataset}'.")
+        value = pl.col(f'wsum_{dataset}').sum() / pl.col(f'w_{dataset}').sum()
+    else:
+        value = pl.col(f'sum_{dataset}').sum() / pl.col(f'n_{dataset}').sum()
+    rolled = agg.groupby([group, 'year']).agg(value.alias(dataset)).collect()
+    # Same layout as pivot_table, one row per year and one column per group
+    pivot_df = rolled.to_pandas().pivot(index='year', columns=group, values=dataset)
+    pivot_df.index.name = 'Year'
+    pivot_df.columns = pivot_df.columns.astype(str)
+    pivot_df.columns.name = None
+    return pivot_df
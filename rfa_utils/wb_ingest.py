@@ -0,0 +1,118 @@
+import os
+import polars as pl
+
+REMITTANCE_DIR = os.path.join('data', 'remittance')
+# World Bank/KNOMAD sources with the indicator name of their rows
+SOURCES = {
+    'sending-cost-to-country.xls': 'cost_to',
+    'sending-cost-from-country.xls': 'cost_from',
+    'personal-remittances-received.xls': 'personal_received',
+    'personal-remittances-paid.xls': 'personal_paid',
+    'remittances-received-percent-gdp.xls': 'percent_gdp_received'
+}
+# Names of the World Bank indicator codes in the sheets' Indicator Code column, other codes are kept as they are
+INDICATORS = {
+    'SI.RMT.COST.IB.ZS': 'cost_to',
+    'SI.RMT.COST.OB.ZS': 'cost_from',
+    'BX.TRF.PWKR.CD.DT': 'personal_received',
+    'BM.TRF.PWKR.CD.DT': 'personal_paid',
+    'BX.TRF.PWKR.DT.GD.ZS': 'percent_gdp_received'
+}
+SCHEMA = {
+    'country_code': pl.Categorical,
+    'indicator': pl.Categorical,
+    'year': pl.Int16,
+    'value': pl.Float64
+}
+
+
+def parse_year(cell) -> int or None:
+    """Return the year of a header cell such as 1960, 1960.0 or '1960', None for other cells"""
+    try:
+        year = int(float(cell))
+    except (TypeError, ValueError):
+        return None
+    return year if 1900 <= year <= 2100 else None
+
+
+def parse_value(cell) -> float or None:
+    """Return a numeric cell as float, None for blanks and markers such as '..'"""
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_rows(path: str, indicator: str = None):
+    """Stream (country_code, indicator, year, value) tuples from a wide .xls sheet with one column per year.
+    Indicator codes are named through INDICATORS, sheets without an Indicator Code column use the given indicator"""
+    import xlrd
+    # on_demand only loads the sheet that is read, rows are unpivoted one at a time
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        header, years = None, {}
+        for i in range(sheet.nrows):
+            row = sheet.row_values(i)
+            if header is None:
+                # Skip the metadata rows above the header row
+                if 'Country Code' in row:
+                    header = row
+                    years = {j: parse_year(cell) for j, cell in enumerate(row) if parse_year(cell)}
+                    code_col = row.index('Country Code')
+                    indicator_col = row.index('Indicator Code') if 'Indicator Code' in row else None
+                continue
+            code = row[code_col]
+            if not code:
+                continue
+            name = INDICATORS.get(row[indicator_col], row[indicator_col]) if indicator_col is not None else indicator
+            for j, year in years.items():
+                value = parse_value(row[j])
+                if value is not None:
+                    yield code, name, year, value
+    finally:
+        book.release_resources()
+
+
+def iter_batches(sources: dict, batch_size: int = 50_000):
+    """Stream typed long dataframes of at most batch_size rows from every source"""
+    batch = []
+    for path, indicator in sources.items():
+        for row in iter_rows(path, indicator):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield pl.DataFrame(batch, schema=SCHEMA, orient='row')
+                batch = []
+    if batch:
+        yield pl.DataFrame(batch, schema=SCHEMA, orient='row')
+
+
+def ingest(out_path: str, sources: dict = None, batch_size: int = 50_000) -> int:
+    """Write the long table of every source to a Parquet file one row group per batch, return the rows written"""
+    import pyarrow.parquet as pq
+    sources = sources or {os.path.join(REMITTANCE_DIR, name): indicator for name, indicator in SOURCES.items()}
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    writer, rows = None, 0
+    try:
+        for batch in iter_batches(sources, batch_size):
+            table = batch.to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+            rows += batch.height
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def indicator_table(path: str, indicator: str, years: tuple = None) -> pl.DataFrame:
+    """Read one indicator back from the long table as a wide Country Code x year table"""
+    lf = pl.scan_parquet(path).filter(pl.col('indicator').cast(pl.Utf8) == indicator)
+    if years is not None:
+        lf = lf.filter(pl.col('year').is_between(years[0], years[1]))
+    long_df = lf.select([pl.col('country_code').cast(pl.Utf8).alias('Country Code'), 'year', 'value']).collect()
+    wide_df = long_df.pivot(values='value', index='Country Code', columns='year', aggregate_function='first')
+    # Year columns in order, as in the source sheets
+    year_cols = sorted(c for c in wide_df.columns if c != 'Country Code')
+    return wide_df.select(['Country Code', *year_cols])
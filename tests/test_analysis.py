@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rfa_ana import analysis as ana
+
+
+@pytest.fixture
+def crypto_dfs():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2019-01-01', '2021-12-31', freq='D', name='date')
+    dfs = {}
+    # Not in alphabetical order, and with missing values
+    for name in ['xrp', 'btc', 'ada']:
+        df = pd.DataFrame({
+            'average_transaction_fees': rng.lognormal(size=len(dates)),
+            'average_transaction_value': rng.lognormal(5, size=len(dates)),
+            '24h_volume': rng.lognormal(10, size=len(dates))
+        }, index=dates)
+        df.iloc[rng.random(len(dates)) < 0.05, 0] = np.nan
+        dfs[name] = df
+    return ana.crypto_fee_percentage(dfs)
+
+
+def test_crypto_fees_scenarios_keeps_order(crypto_dfs):
+    scenario_df = ana.crypto_fees_scenarios(crypto_dfs, stats=('mean', 'p50'))
+    assert list(scenario_df.columns) == ['crypto', 'year', 'mean_fee_percent', 'p50_fee_percent', 'volume_weight']
+    assert list(scenario_df['crypto']) == [name for name in crypto_dfs for _ in range(3)]
+    assert list(scenario_df['year']) == [2019, 2020, 2021] * 3
+    assert scenario_df['year'].dtype == np.int64
+    assert scenario_df['crypto'].dtype == object
+
+    # Same values as grouping each symbol on its own
+    for name, df in crypto_dfs.items():
+        rows = scenario_df[scenario_df['crypto'] == name].set_index('year')
+        by_year = df.groupby(df.index.year)
+        np.testing.assert_allclose(rows['mean_fee_percent'], by_year['fee_percentage'].mean())
+        np.testing.assert_allclose(rows['p50_fee_percent'], by_year['fee_percentage'].median())
+        np.testing.assert_allclose(rows['volume_weight'], by_year['24h_volume'].mean())
+
+
+def test_stablecoin_fees_scenarios_years(crypto_dfs):
+    fees = crypto_dfs['btc'].rename(columns={'average_transaction_fees': 'transaction_fees'})
+    scenario_df = ana.stablecoin_fees_scenarios(fees, amounts=(100, 200))
+    assert list(scenario_df.index) == [2019, 2020, 2021]
+    assert scenario_df.index.dtype == np.int64
+    expected = fees.groupby(fees.index.year)['transaction_fees'].mean() / 200 * 100
+    np.testing.assert_allclose(scenario_df['Stablecoin (200)'], expected)
+
+
+def test_scenario_engine_quarters(crypto_dfs):
+    result = ana.scenario_engine(crypto_dfs, 'fee_percentage', period='quarter')
+    assert list(result['symbol'].unique()) == list(crypto_dfs)
+    assert len(result) == 3 * 12
+    assert result['quarter'].iloc[0] == pd.Period('2019Q1')
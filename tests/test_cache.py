@@ -0,0 +1,104 @@
+import hashlib
+from datetime import date
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+from rfa_utils import cache
+from rfa_utils import general_fns as gf
+from rfa_utils.coingecko_api import RateLimiter
+
+
+def key(obj) -> str:
+    h = hashlib.sha256()
+    cache.update_hash(h, obj)
+    return h.hexdigest()
+
+
+@pytest.mark.parametrize('a, b', [
+    (pl.DataFrame({'x': [1, 2]}).lazy(), pl.DataFrame({'x': [1, 3]}).lazy()),
+    (pl.Series('x', [1.0, 2.0]), pl.Series('x', [1.0, 2.5])),
+    (np.arange(4), np.arange(1, 5)),
+    (np.array(['a', 'b'], dtype=object), np.array(['a', 'c'], dtype=object)),
+    (pd.Series([1.0, 2.0]), pd.Series([1.0, 2.5])),
+    (date(2019, 1, 1), date(2022, 12, 31)),
+    ({'a', 'b'}, {'a', 'c'}),
+    (np.int64(1), np.int64(2))
+])
+def test_contents_change_the_key(a, b):
+    assert key(a) != key(b)
+    assert key(a) == key(a)
+
+
+def test_clients_are_keyed_by_type():
+    assert key(RateLimiter(1, 1)) == key(RateLimiter(2, 5))
+
+
+def test_unknown_objects_raise():
+    with pytest.raises(TypeError):
+        key(object())
+
+
+def test_stage_reuses_results_until_inputs_change(tmp_path):
+    calls = []
+
+    def build(df: pl.LazyFrame) -> pl.DataFrame:
+        calls.append(1)
+        return df.collect()
+
+    cached = cache.stage(build, cache_dir=str(tmp_path))
+    lf = pl.DataFrame({'x': [1, 2]}).lazy()
+    assert cached(lf).frame_equal(lf.collect())
+    cached(lf)
+    cached(pl.DataFrame({'x': [1, 3]}).lazy())
+    assert len(calls) == 2
+
+
+def limits_build(df: pl.DataFrame, limits: tuple = (0.05, 0.05), workers: int = 1) -> pl.DataFrame:
+    return df
+
+
+class Other:
+    @staticmethod
+    def limits_build(df: pl.DataFrame, limits: tuple = (0.05, 0.05), workers: int = 1) -> pl.DataFrame:
+        return df
+
+
+def test_stage_key_binds_defaults():
+    df = pl.DataFrame({'x': [1]})
+    key = cache.stage_key(limits_build, (df,), {})
+    assert key == cache.stage_key(limits_build, (), {'df': df, 'limits': (0.05, 0.05)})
+    assert key != cache.stage_key(limits_build, (df, (0.01, 0.01)), {})
+    # Functions of the same name are told apart by module and qualname
+    assert key != cache.stage_key(Other.limits_build, (df,), {})
+    # Ignored arguments do not change the key
+    assert cache.stage_key(limits_build, (df,), {'workers': 8}, ignore=('workers',)) == cache.stage_key(limits_build, (df,), {}, ignore=('workers',))
+    assert cache.stage_key(limits_build, (df,), {'workers': 8}) != key
+
+
+def test_check_and_build_rebuilds_on_new_parameters(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    calls = []
+
+    def build(n: int, scale: int = 1) -> pl.DataFrame:
+        calls.append((n, scale))
+        return pl.DataFrame({'x': [n * scale]})
+
+    path = str(tmp_path / 'data.xlsx')
+    cached = cache.stage(build, cache_dir=str(tmp_path / 'cache'))
+    assert cache.check_and_build(path, cached, 1)
+    assert not cache.check_and_build(path, cached, 1)
+    assert cache.check_and_build(path, cached, 1, scale=2)
+    assert gf.import_data(path, ['Sheet1'])['Sheet1']['x'].to_list() == [2]
+    # Back to the first parameters, read from the cache
+    assert cache.check_and_build(path, cached, 1)
+    assert calls == [(1, 1), (1, 2)]
+
+
+def test_datasets_without_a_key_are_current(tmp_path):
+    path = str(tmp_path / 'data.xlsx')
+    gf.create_store(path, pl.DataFrame({'x': [1]}))
+    assert cache.is_current(path, 'any')
+    cache.write_key(path, 'a')
+    assert cache.is_current(path, 'a') and not cache.is_current(path, 'b')
+    assert not cache.is_current(str(tmp_path / 'missing.xlsx'), 'a')
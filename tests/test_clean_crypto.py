@@ -0,0 +1,121 @@
+import os
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+from scipy.stats import mstats
+from rfa.stages import CRYPTO_SYMS, SCRAPED_SHEETS, START, END
+from rfa_utils import clean_crypto as cc
+from rfa_utils import general_fns as gf
+from rfa_utils.coingecko_api import fill_date
+from benchmarks import synthetic as syn
+
+
+def scipy_winsorize(values: np.ndarray, limits: tuple) -> np.ndarray:
+    """Winsorize like the original Messari cleaning, missing values as NaN"""
+    return np.asarray(mstats.winsorize(values, limits=limits), dtype=float)
+
+
+def as_array(series: pl.Series) -> np.ndarray:
+    return series.cast(pl.Float64).fill_null(np.nan).to_numpy()
+
+
+@pytest.mark.parametrize('limits', [(0.05, 0.05), (0.01, 0.01), (0.1, None)])
+@pytest.mark.parametrize('lazy', [False, True])
+def test_winsorize_df_matches_scipy(limits, lazy):
+    df = syn.messari_df(500, cols=3)
+    result = cc.winsorize_df(df.lazy(), limits).collect() if lazy else cc.winsorize_df(df, limits)
+    for col in df.columns[1:]:
+        np.testing.assert_array_equal(as_array(result[col]), scipy_winsorize(as_array(df[col]), limits))
+
+
+def test_winsorize_df_lazy_filter():
+    # Filters after winsorizing are not pushed below it
+    df = syn.messari_df(500, cols=1)
+    expected = cc.winsorize_df(df).tail(50)
+    assert cc.winsorize_df(df.lazy()).filter(pl.col('date') > df['date'][-51]).collect().frame_equal(expected)
+
+
+@pytest.mark.parametrize('by', ['g', ['g']])
+@pytest.mark.parametrize('lazy', [False, True])
+def test_winsorize_df_by_group_matches_scipy(by, lazy):
+    df = syn.messari_df(600, cols=2).with_columns((pl.int_range(0, pl.count()) % 3).alias('g'))
+    cols = ['stat_0', 'stat_1']
+    result = cc.winsorize_df(df.lazy() if lazy else df, (0.05, 0.05), cols, by=by)
+    result = result.collect() if lazy else result
+    assert result.columns == df.columns
+    for g in range(3):
+        mask = (df['g'] == g).to_numpy()
+        for col in cols:
+            expected = scipy_winsorize(as_array(df[col])[mask], (0.05, 0.05))
+            np.testing.assert_array_equal(as_array(result[col])[mask], expected)
+
+
+def test_winsorize_df_empty():
+    df = syn.messari_df(10, cols=2).head(0)
+    assert cc.winsorize_df(df, (0.05, 0.05)).frame_equal(df)
+    assert cc.winsorize_df(df.lazy(), (0.05, 0.05), by='stat_0').collect().frame_equal(df)
+
+
+def baseline_merge(api_data: dict, scraped_data: dict, names: list) -> dict:
+    """The eager scipy merge that merge_api_scraped replaced"""
+    scraped = dict(scraped_data)
+    for name in ['xrp_mes', 'bsv_mes', 'xlm']:
+        df = scraped[name]
+        for col in df.columns[1:]:
+            df = df.with_columns(pl.Series(col, np.asarray(mstats.winsorize(df[col].to_numpy(), limits=(0.05, 0.05)))))
+        scraped[name] = fill_date(df)
+    cc.combine_xrp_bsv(scraped)
+    return {name: api_data[name].join(scraped[name], on='date', how='inner') for name in names}
+
+
+@pytest.fixture(scope='module')
+def filled_data():
+    paths = [os.path.join('data', 'crypto', f'filled-{kind}-data.xlsx') for kind in ('api', 'scraped')]
+    if not all(gf.store_exists(path) or os.path.exists(path) for path in paths):
+        pytest.skip('filled crypto data not available')
+    return gf.import_data(paths[0], CRYPTO_SYMS), gf.import_data(paths[1], SCRAPED_SHEETS)
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_merge_api_scraped_matches_baseline(filled_data, lazy):
+    api, scraped = filled_data
+    expected = baseline_merge(api, scraped, CRYPTO_SYMS)
+    if lazy:
+        api, scraped = {k: df.lazy() for k, df in api.items()}, {k: df.lazy() for k, df in scraped.items()}
+        result = cc.merge_api_scraped(api, scraped, CRYPTO_SYMS, START, END)
+    else:
+        result = cc.merge_api_scraped(api, scraped, CRYPTO_SYMS)
+    for name in CRYPTO_SYMS:
+        assert result[name].columns == expected[name].columns
+        for col in expected[name].columns[1:]:
+            # The baseline kept missing values as NaN
+            np.testing.assert_allclose(as_array(result[name][col]), as_array(expected[name][col].fill_nan(None)), rtol=1e-12)
+        assert result[name]['date'].series_equal(expected[name]['date'])
+
+
+def baseline_impute(dfs: dict, ignore: list = []) -> dict:
+    """Impute like the original serial loop over the dataframes"""
+    imputed = {}
+    for k, df in dfs.items():
+        df = df.to_pandas()
+        if k not in ignore:
+            df = pd.concat([df['date'], cc.mf_impute(df.drop('date', axis=1))], axis=1)
+        imputed[k] = pl.from_pandas(df)
+    return imputed
+
+
+def test_impute_dfs_matches_serial_loop():
+    pytest.importorskip('miceforest')
+    dfs = {name: syn.messari_df(120, cols=3, seed=seed) for seed, name in enumerate(['btc', 'ltc', 'dai'])}
+    # Every sheet has missing values to impute
+    assert all(df.null_count().sum(axis=1).item() for df in dfs.values())
+    expected = baseline_impute(dfs, ignore=['dai'])
+    serial = cc.impute_dfs(dfs, ignore=['dai'], workers=1)
+    pooled = cc.impute_dfs(dfs, ignore=['dai'], workers=3)
+    assert list(serial) == list(pooled) == ['btc', 'ltc', 'dai']
+    for name in dfs:
+        assert serial[name].frame_equal(expected[name], null_equal=True)
+        assert pooled[name].frame_equal(serial[name], null_equal=True)
+    assert serial['dai'] is dfs['dai']
+    assert serial['btc'].null_count().sum(axis=1).item() == 0
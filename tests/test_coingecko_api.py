@@ -0,0 +1,104 @@
+import json
+from time import monotonic
+from datetime import date
+import polars as pl
+import pytest
+import requests
+from benchmarks import synthetic as syn
+from rfa_utils import coingecko_api as cg
+
+
+@pytest.fixture
+def fast_limiter(monkeypatch):
+    limiter = cg.RateLimiter(rate=100, capacity=10)
+    monkeypatch.setattr(cg, 'limiter', limiter)
+    return limiter
+
+
+def test_get_json_honours_retry_after(stub_server, fast_limiter):
+    # Rate limited on the first call, then the data
+    def respond(path, query):
+        if len(stub_server.requests) == 1:
+            return 429, {'Retry-After': '1'}, b''
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'ok': True})
+    stub_server.respond = respond
+
+    started = monotonic()
+    data = cg.get_json(f'{stub_server.url}/ping', {'a': 1}, session=requests.Session())
+    assert data == {'ok': True}
+    assert len(stub_server.requests) == 2
+    assert stub_server.requests[0] == ('/ping', {'a': '1'})
+    # Waited for Retry-After rather than the 2 second backoff
+    assert 1 <= monotonic() - started < 2
+
+
+def test_get_json_raises_after_retries(stub_server, fast_limiter):
+    stub_server.respond = lambda path, query: (503, {'Retry-After': '0'}, b'')
+    with pytest.raises(requests.HTTPError):
+        cg.get_json(f'{stub_server.url}/ping', {}, session=requests.Session(), retries=2)
+    assert len(stub_server.requests) == 3
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = cg.RateLimiter(rate=20, capacity=1)
+    started = monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    # The first call uses the burst, the other four wait 1/20 s each
+    assert monotonic() - started >= 0.19
+
+
+def test_create_df_against_stub(stub_server, fast_limiter):
+    chart = syn.market_chart_json(31)
+    stub_server.respond = lambda path, query: (200, {'Content-Type': 'application/json'}, json.dumps(chart))
+
+    df = cg.create_df('bitcoin', 'usd', '2019/01/01', '2019/01/31', base_url=stub_server.url)
+    path, query = stub_server.requests[0]
+    assert path == '/coins/bitcoin/market_chart/range'
+    assert query == {'vs_currency': 'usd', 'from': '1546300800', 'to': '1548979199'}
+    assert df.columns == ['date', 'prices', 'market_caps', 'total_volumes']
+    assert df.height == 31 and df['date'].is_sorted()
+    # Zero prices come back as nulls
+    expected = [v or None for _, v in chart['prices']]
+    assert df['prices'].to_list() == expected
+    assert df.schema['date'] == pl.Date
+
+
+def market_chart(query: dict) -> dict:
+    """Market chart of the queried range with one point per day, each value the day number since the epoch"""
+    stamps = range(int(query['from']) // 86400 * 86400, int(query['to']) + 1, 86400)
+    return {key: [[stamp * 1000, float(stamp // 86400)] for stamp in stamps] for key in ['prices', 'market_caps', 'total_volumes']}
+
+
+@pytest.fixture
+def chart_stub(stub_server, fast_limiter):
+    stub_server.respond = lambda path, query: (200, {'Content-Type': 'application/json'}, json.dumps(market_chart(query)))
+    return stub_server
+
+
+def test_update_df_appends_missing_days(chart_stub):
+    stored = cg.create_df('bitcoin', 'usd', '2019/01/01', '2019/06/30', base_url=chart_stub.url)
+    df = cg.update_df(stored, 'bitcoin', 'usd', '2019/07/10', base_url=chart_stub.url)
+    # Fetched far enough back for daily points, only the days after the stored ones are appended
+    _, query = chart_stub.requests[-1]
+    assert query['from'] == str(cg.unix_time('2019/04/10 00:00:00'))
+    assert df.head(stored.height).frame_equal(stored)
+    assert df['date'][-1] == date(2019, 7, 10) and df.height == stored.height + 10
+    assert df['prices'].to_list() == [float((d - date(1970, 1, 1)).days) for d in df['date']]
+
+    # Nothing is fetched once the end date is stored
+    requests_made = len(chart_stub.requests)
+    assert cg.update_df(df, 'bitcoin', 'usd', '2019/07/10', base_url=chart_stub.url) is df
+    assert len(chart_stub.requests) == requests_made
+
+
+def test_update_api_dict_creates_new_symbols(chart_stub):
+    data = {'btc': cg.create_df('bitcoin', 'usd', '2019/01/01', '2019/12/31', base_url=chart_stub.url)}
+    updated = cg.update_api_dict(data, ['btc', 'ltc'], ['bitcoin', 'litecoin'], 'usd', '2019/01/01', '2020/01/31',
+                                 base_url=chart_stub.url)
+    assert list(updated) == ['btc', 'ltc']
+    for df in updated.values():
+        assert df['date'][0] == date(2019, 1, 1) and df['date'][-1] == date(2020, 1, 31)
+        assert df.height == 396
+    # The new symbol was fetched over the whole range
+    assert ('/coins/litecoin/market_chart/range', {'vs_currency': 'usd', 'from': '1546300800', 'to': '1580515199'}) in chart_stub.requests
@@ -0,0 +1,50 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import polars as pl
+from rfa_eda import report
+from rfa_utils import correlation as corr
+from benchmarks import synthetic as syn
+
+
+def test_rolling_corrs_match_pandas():
+    dfs = syn.pandas_panel(400, ['btc', 'ltc'])
+    dfs['btc'].iloc[10:20, 0] = np.nan
+    corrs = corr.rolling_corrs(dfs, (('average_transaction_fees', '24h_volume'),), windows=(30,))
+    for sym, df in dfs.items():
+        expected = df['average_transaction_fees'].rolling(30).corr(df['24h_volume'])
+        # pandas needs a full window of pairs, as the default min_periods does
+        np.testing.assert_allclose(corrs['average_transaction_fees_vs_24h_volume_roll30'][sym], expected, atol=1e-9)
+
+
+def test_metric_corrs_match_df_corr():
+    dfs = syn.pandas_panel(200, ['btc'])
+    dfs['btc'].iloc[5:15, 1] = np.nan
+    result = corr.metric_corrs(dfs)['btc']
+    pd.testing.assert_frame_equal(result, dfs['btc'].corr(), check_names=False, atol=1e-9)
+
+
+def test_save_and_load_correlations(tmp_path):
+    corrs = corr.build_correlations(syn.pandas_panel(120, ['btc', 'ltc']), windows=(30,))
+    path = str(tmp_path / 'correlations')
+    corr.save_correlations(path, corrs)
+    loaded = corr.load_correlations(path)
+    assert set(loaded) == set(corrs)
+    pd.testing.assert_frame_equal(loaded['corr_btc'], corrs['corr_btc'], check_names=False)
+
+
+def test_cross_corrs_pickle():
+    cross = corr.cross_corrs(syn.pandas_panel(60, ['btc', 'ltc']), windows=(30,))['average_transaction_fees_cross_roll30']
+    assert cross.schema['symbol_a'] == pl.Utf8
+    assert pickle.loads(pickle.dumps(cross)).frame_equal(cross)
+
+
+def test_report_from_stored_correlations(tmp_path):
+    dfs = syn.pandas_panel(120, ['btc', 'ltc'])
+    path = str(tmp_path / 'correlations')
+    corr.save_correlations(path, corr.build_correlations(dfs, windows=(30,)))
+    jobs = [job for job in report.eda_jobs(crypto=dfs, correlations=corr.load_correlations(path)) if job.name == 'crypto-corr-heatmaps']
+    html_path = report.render_report(jobs, str(tmp_path / 'report'), workers=2)
+    assert os.path.exists(html_path)
+    assert os.path.exists(tmp_path / 'report' / 'crypto-corr-heatmaps.png')
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from benchmarks import synthetic as syn
+from rfa_utils import crypto_scrape as cs
+from rfa_utils.chart_parser import parse_chart
+
+START, END = '2019/01/01', '2019/01/31'
+PAGE = syn.chart_page(4000, padding=1000)
+
+
+@pytest.fixture
+def chart_stub(stub_server):
+    """BitInfoCharts pages for every stat, failing the first request for transaction fees"""
+    def respond(path, query):
+        if path.endswith('transactionfees-btc.html') and sum(p == path for p, _ in stub_server.requests) == 1:
+            return 500, {}, b''
+        return 200, {'Content-Type': 'text/html'}, PAGE
+    stub_server.respond = respond
+    return stub_server
+
+
+def test_http_driver_find_element(chart_stub):
+    driver = cs.HttpDriver(timeout=5)
+    driver.get(f'{chart_stub.url}/comparison/transactions-btc.html')
+    assert driver.find_element('id', 'container') == 'container'
+    with pytest.raises(NoSuchElementException):
+        driver.find_element('id', 'missing')
+    driver.quit()
+
+
+def test_create_scrape_dict_pool_against_stub(chart_stub):
+    token_stats = {'btc': ['transactions-btc', 'transactionfees-btc'], 'eth': ['transactions-eth']}
+    dfs = cs.create_scrape_dict_pool(token_stats, START, END, workers=2, driver_factory=cs.HttpDriver,
+                                     base_url=f'{chart_stub.url}/comparison/', timeout=5, wait_time=0.5)
+    paths = [path for path, _ in chart_stub.requests]
+    # The fragment is not sent and the failed page is fetched again
+    assert sorted(set(paths)) == ['/comparison/transactionfees-btc.html', '/comparison/transactions-btc.html',
+                                  '/comparison/transactions-eth.html']
+    assert paths.count('/comparison/transactionfees-btc.html') == 2
+
+    _, expected = parse_chart(PAGE, START, END)
+    assert list(dfs) == ['btc', 'eth']
+    assert dfs['btc'].columns == ['date', 'transactions-btc', 'transactionfees-btc']
+    assert dfs['btc'].height == 31
+    for df, stat in [(dfs['btc'], 'transactions-btc'), (dfs['btc'], 'transactionfees-btc'), (dfs['eth'], 'transactions-eth')]:
+        np.testing.assert_array_equal(df[stat].to_numpy(), expected)
+
+
+def test_missing_chart_times_out(stub_server):
+    stub_server.respond = lambda path, query: (200, {'Content-Type': 'text/html'}, '<html><body></body></html>')
+    with pytest.raises(TimeoutException):
+        cs.create_scrape_dict_pool({'btc': ['transactions-btc']}, START, END, workers=1, driver_factory=cs.HttpDriver,
+                                   base_url=f'{stub_server.url}/comparison/', retries=0, timeout=5, wait_time=0.2)
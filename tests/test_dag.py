@@ -0,0 +1,119 @@
+import os
+import polars as pl
+import pytest
+from rfa import dag
+from rfa import __main__ as cli
+from rfa_utils import general_fns as gf
+
+
+def make_build(scale: int):
+    def build(scale: int = scale) -> pl.DataFrame:
+        return pl.DataFrame({'x': [scale]})
+    return build
+
+
+def test_new_stage_parameters_rebuild(tmp_path):
+    output = str(tmp_path / 'data.xlsx')
+    stages = {'a': dag.Stage('a', make_build(1), output)}
+    dag.build_stage(stages['a'])
+    assert dag.plan(stages) == []
+    # The same stage function with another default parameter
+    stages = {'a': dag.Stage('a', make_build(2), output)}
+    assert dag.plan(stages) == ['a']
+
+
+def test_update_appends_to_stored_output(tmp_path):
+    output = str(tmp_path / 'data.xlsx')
+
+    def build(rows: int = 3) -> pl.DataFrame:
+        return pl.DataFrame({'x': list(range(rows))})
+
+    def update(df: pl.DataFrame, rows: int = 3) -> pl.DataFrame:
+        return pl.concat([df, pl.DataFrame({'x': [-1]})])
+
+    stage = dag.Stage('a', build, output, update=update)
+    # Built in full when there is no stored output
+    dag.build_stage(stage, update=True)
+    assert gf.import_data(output, ['Sheet1'])['Sheet1']['x'].to_list() == [0, 1, 2]
+    dag.build_stage(stage, update=True)
+    assert gf.import_data(output, ['Sheet1'])['Sheet1']['x'].to_list() == [0, 1, 2, -1]
+    assert dag.plan({'a': stage}) == []
+    dag.build_stage(stage)
+    assert gf.import_data(output, ['Sheet1'])['Sheet1']['x'].to_list() == [0, 1, 2]
+
+
+@pytest.fixture
+def toy(tmp_path, monkeypatch):
+    """Stages a -> b -> c and a lone d writing to tmp_path, run through the CLI with the names of built stages in toy.built"""
+    built = []
+
+    def builder(name: str):
+        def build() -> pl.DataFrame:
+            built.append(name)
+            return pl.DataFrame({'x': [1]})
+        return build
+
+    deps = {'a': (), 'b': ('a',), 'c': ('b',), 'd': ()}
+    stages = {name: dag.Stage(name, builder(name), str(tmp_path / f'{name}.xlsx'), dep) for name, dep in deps.items()}
+    monkeypatch.setattr(cli, 'STAGES', stages)
+
+    def run(*argv: str) -> list:
+        built.clear()
+        cli.main([*argv, '--workers', '1'])
+        return sorted(built)
+    run.stages = stages
+    return run
+
+
+def age(stage: dag.Stage, seconds: float) -> None:
+    """Move the output of a stage and its files back in time"""
+    path = gf.store_path(stage.output)
+    for file_path in [path] + [entry.path for entry in os.scandir(path)]:
+        os.utime(file_path, (os.path.getmtime(file_path) - seconds,) * 2)
+
+
+def test_cli_builds_missing_then_nothing(toy):
+    assert toy() == ['a', 'b', 'c', 'd']
+    assert toy() == []
+
+
+def test_cli_only(toy):
+    assert toy('--only', 'b,d') == ['b', 'd']
+    # Missing stages outside --only are left alone
+    assert toy('--only', 'c') == ['c']
+    # Building a rebuilds everything downstream of it
+    assert toy() == ['a', 'b', 'c']
+
+
+def test_cli_from_and_force(toy):
+    toy()
+    assert toy('--from', 'b') == ['b', 'c']
+    assert toy('--force') == ['a', 'b', 'c', 'd']
+    assert toy('--force', '--only', 'a') == ['a']
+
+
+def test_cli_unknown_stage(toy, capsys):
+    with pytest.raises(SystemExit):
+        toy('--only', 'e')
+    assert 'Unknown stages' in capsys.readouterr().err
+
+
+def test_cli_dry_run(toy, capsys):
+    toy()
+    capsys.readouterr()
+    age(toy.stages['b'], 10)
+    # Nothing is built, the stages that would rebuild are listed in order
+    assert toy('--dry-run', '--from', 'a') == []
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(' -> ')[0] for line in lines] == ['a', 'b', 'c']
+    assert lines[1].endswith('(after a)')
+
+
+def test_stale_outputs_older_than_dependencies(toy):
+    toy()
+    # b is older than a, so b and everything downstream rebuild
+    for name in ['b', 'c', 'd']:
+        age(toy.stages[name], 10)
+    assert dag.plan(toy.stages) == ['b', 'c']
+    assert toy() == ['b', 'c']
+    assert dag.plan(toy.stages) == []
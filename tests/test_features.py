@@ -0,0 +1,25 @@
+import pandas as pd
+from rfa_eda import report
+from rfa_utils import features as feat
+from benchmarks import synthetic as syn
+
+
+def test_saved_features_are_read_back(tmp_path):
+    dfs = syn.pandas_panel(120, ['btc', 'ltc'])
+    features = feat.build_features(dfs)
+    path = str(tmp_path / 'features')
+    # Built from the dataframes until the store is written
+    assert feat.stored_features(path, dfs).keys() == features.keys()
+    feat.save_features(path, features)
+    loaded = feat.stored_features(path, {})
+    assert loaded.keys() == features.keys()
+    for name, df in features.items():
+        pd.testing.assert_frame_equal(loaded[name], df, check_freq=False, check_names=False, check_index_type=False)
+
+
+def test_fee_percentage_job_with_stored_features(tmp_path):
+    dfs = syn.pandas_panel(120, ['btc', 'ltc', 'xmr'])
+    # The crypto_features stage leaves out xmr
+    features = feat.build_features({name: df for name, df in dfs.items() if name != 'xmr'})
+    job = next(job for job in report.eda_jobs(crypto=dfs, crypto_features=features) if job.name == 'crypto-fee-percentage')
+    assert report.render_job(job, str(tmp_path)) == [str(tmp_path / 'crypto-fee-percentage.png')]
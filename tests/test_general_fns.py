@@ -0,0 +1,46 @@
+from datetime import date
+import polars as pl
+from rfa_utils import general_fns as gf
+
+
+def frame(days: int) -> pl.DataFrame:
+    return pl.DataFrame({
+        'date': pl.date_range(date(2019, 1, 1), date(2019, 1, days), interval='1d', eager=True),
+        'prices': [day + 0.5 for day in range(days)]
+    })
+
+
+def create_dict(symbols: list, days: int) -> dict:
+    return {symbol: frame(days) for symbol in symbols}
+
+
+def update_dict(data: dict, symbols: list, days: int) -> dict:
+    # Only the rows after the stored ones, like the API update functions
+    return {symbol: pl.concat([data[symbol], frame(days)[data[symbol].height:]]) for symbol in symbols}
+
+
+def test_check_and_update_store(tmp_path):
+    path = str(tmp_path / 'api-data.xlsx')
+    gf.check_and_update(path, create_dict, update_dict, ['btc', 'ltc'], 10)
+    assert gf.import_data(path, ['btc'])['btc'].frame_equal(frame(10))
+    gf.check_and_update(path, create_dict, update_dict, ['btc', 'ltc'], 20)
+    data = gf.import_data(path, ['btc', 'ltc'])
+    assert all(df.frame_equal(frame(20)) for df in data.values())
+
+
+def test_check_and_update_single_frame(tmp_path):
+    path = str(tmp_path / 'fees-data.xlsx')
+    gf.check_and_update(path, lambda days: frame(days), lambda df, days: pl.concat([df, frame(days)[df.height:]]), 5)
+    gf.check_and_update(path, lambda days: frame(days), lambda df, days: pl.concat([df, frame(days)[df.height:]]), 8)
+    assert gf.import_data(path, ['Sheet1'])['Sheet1'].frame_equal(frame(8))
+
+
+def test_check_and_update_legacy_excel(tmp_path):
+    path = str(tmp_path / 'api-data.xlsx')
+    gf.create_excel(path, create_dict(['btc', 'ltc'], 10))
+    assert list(gf.import_excel(path)) == ['btc', 'ltc']
+    # The Excel sheets are updated into the data store, not skipped
+    gf.check_and_update(path, create_dict, update_dict, ['btc', 'ltc'], 15)
+    assert gf.store_names(path) == ['btc', 'ltc']
+    data = gf.import_data(path, ['btc', 'ltc'])
+    assert all(df.frame_equal(frame(15)) for df in data.values())
@@ -0,0 +1,11 @@
+import pytest
+from benchmarks.bench_import import BUDGETS, import_time
+
+
+@pytest.mark.parametrize('module', list(BUDGETS))
+def test_import_budget(module):
+    # The fastest of a few fresh interpreters, the first one may pay for a cold disk cache
+    timings = [import_time(module) for _ in range(3)]
+    ms = min(ms for ms, _ in timings)
+    assert not timings[0][1], f'{module} loaded {timings[0][1]} at import'
+    assert ms <= BUDGETS[module], f'{module} took {ms:.0f} ms to import, budget {BUDGETS[module]} ms'
@@ -0,0 +1,60 @@
+import json
+import types
+import functools
+import importlib
+import pandas as pd
+from rfa.dag import Stage
+from rfa_utils.panel import Panel
+from rfa_utils.instrument import ENTRY_POINTS, count_rows, instrument, instrument_attr, instrument_stages
+from benchmarks import synthetic as syn
+
+
+def test_nested_call_keeps_caller_peak(tmp_path):
+    log = str(tmp_path / 'metrics.jsonl')
+
+    def helper():
+        return bytearray(1024)
+
+    def outer():
+        data = bytearray(40 * 1024 ** 2)
+        del data
+        return wrapped_helper()
+
+    wrapped_helper = instrument(helper, log_path=log, trace_memory=True)
+    instrument(outer, log_path=log, trace_memory=True)()
+    records = {r['fn'].rsplit('.', 1)[-1]: r for r in map(json.loads, open(log))}
+    assert records['outer']['depth'] == 0 and records['helper']['depth'] == 1
+    assert records['outer']['peak_traced_mb'] >= 40
+    assert records['helper']['peak_traced_mb'] < 40
+
+
+def test_entry_points_exist():
+    for name, paths in ENTRY_POINTS.items():
+        module = importlib.import_module(name)
+        for path in paths:
+            assert callable(functools.reduce(getattr, path.split('.'), module)), f'{name}.{path}'
+    assert 'store_path' not in ENTRY_POINTS['rfa_utils.general_fns']
+
+
+def test_instrument_stages_and_methods(tmp_path):
+    log = str(tmp_path / 'metrics.jsonl')
+    module = types.ModuleType('toy')
+
+    class Table:
+        @classmethod
+        def build(cls, n: int) -> pd.DataFrame:
+            return pd.DataFrame({'x': range(n)})
+
+    module.Table = Table
+    instrument_attr(module, 'Table.build', log_path=log)
+    stages = {'toy': Stage('toy', lambda: Table.build(3), str(tmp_path / 'toy.xlsx'))}
+    instrument_stages(stages, log_path=log)
+    assert stages['toy'].build().shape == (3, 1)
+    records = [json.loads(line) for line in open(log)]
+    assert [(r['fn'].rsplit('.', 1)[-1], r['depth'], r['rows_out']) for r in records] == [('build', 1, 3), ('<lambda>', 0, 3)]
+
+
+def test_count_rows_of_panel():
+    dfs = syn.pandas_panel(30, ['btc', 'ltc'])
+    assert count_rows(Panel.from_dict(dfs)) == 60
+    assert count_rows([dfs, {'n': 1}]) == 60
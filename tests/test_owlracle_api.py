@@ -0,0 +1,88 @@
+import json
+from datetime import date, datetime, timezone
+import polars as pl
+import pytest
+from rfa_utils import owlracle_api as oa
+from rfa_utils.coingecko_api import RateLimiter
+
+DAY = 86400
+
+
+def candle(stamp: int) -> dict:
+    """Daily candle whose txFee is the day number since the epoch and gasPrice ten times it"""
+    day = stamp // DAY
+    return {
+        'timestamp': datetime.fromtimestamp(stamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'txFee': {'close': float(day)},
+        'gasPrice': {'close': float(day * 10)}
+    }
+
+
+@pytest.fixture
+def owlracle_stub(stub_server, monkeypatch):
+    """Canned Owlracle history, rate limited on the first call and with a neighbouring candle before each window"""
+    def respond(path, query):
+        if len(stub_server.requests) == 1:
+            return 429, {'Retry-After': '0'}, b''
+        start, end = int(query['from']), int(query['to'])
+        candles = [candle(stamp) for stamp in range(start - DAY, end, DAY)]
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'candles': candles})
+    stub_server.respond = respond
+    monkeypatch.setattr(oa, 'limiter', RateLimiter(rate=100, capacity=10))
+    monkeypatch.setattr(oa, '_env_loaded', True)
+    monkeypatch.setenv('OAPI', 'test-key')
+    return stub_server
+
+
+def test_create_df_against_stub(owlracle_stub):
+    df = oa.create_df('2019/06/01', '2020/03/01', base_url=f'{owlracle_stub.url}/history')
+    # One window per year plus the rate limited retry
+    assert len(owlracle_stub.requests) == 3
+    queries = sorted((q for _, q in owlracle_stub.requests[1:]), key=lambda q: int(q['from']))
+    assert [q['from'] for q in queries] == ['1546300800', '1577836800']
+    assert all(q['apikey'] == 'test-key' and q['txfee'] == 'true' for q in queries)
+    assert queries[0]['candles'] == '365' and queries[1]['candles'] == '366'
+
+    # Candles outside the windows are dropped, every day of both years is kept once
+    assert df.columns == ['date', 'transaction_fees', 'gas_prices']
+    assert df['date'][0] == date(2019, 1, 1) and df['date'][-1] == date(2020, 12, 31)
+    assert df.height == 731
+    days = (df['date'].cast(pl.Int32)).cast(pl.Float64)
+    assert (df['transaction_fees'] == days).all()
+    assert (df['gas_prices'] == days * 10).all()
+
+
+def test_update_df_fetches_days_after_last_stored(owlracle_stub):
+    stored = pl.DataFrame({
+        'date': pl.date_range(date(2019, 1, 1), date(2019, 12, 30), interval='1d', eager=True),
+    }).with_columns([
+        pl.col('date').cast(pl.Int32).cast(pl.Float64).alias('transaction_fees'),
+        (pl.col('date').cast(pl.Int32) * 10).cast(pl.Float64).alias('gas_prices')
+    ])
+    df = oa.update_df(stored, '2019/01/01', '2020/01/05', base_url=f'{owlracle_stub.url}/history')
+    # One window from the first missing day through the end date, after the rate limited retry
+    assert len(owlracle_stub.requests) == 2
+    _, query = owlracle_stub.requests[1]
+    assert (query['from'], query['to'], query['candles']) == ('1577750400', '1578268800', '6')
+    assert df.head(stored.height).frame_equal(stored)
+    assert df['date'][-1] == date(2020, 1, 5) and df.height == stored.height + 6
+    days = (df['date'].cast(pl.Int32)).cast(pl.Float64)
+    assert (df['transaction_fees'] == days).all()
+
+    # Nothing is fetched once the end date is stored
+    assert oa.update_df(df, '2019/01/01', '2020/01/05', base_url=f'{owlracle_stub.url}/history') is df
+    assert len(owlracle_stub.requests) == 2
+
+
+def test_update_df_hourly(owlracle_stub):
+    stored = pl.DataFrame({
+        'date': pl.date_range(datetime(2019, 1, 1), datetime(2019, 1, 1, 23), interval='1h', time_unit='ms', eager=True),
+        'transaction_fees': [1.0] * 24,
+        'gas_prices': [10.0] * 24
+    })
+    df = oa.update_df(stored, '2019/01/01', '2019/01/02', '1h', base_url=f'{owlracle_stub.url}/history')
+    # The hours of the end date after the last stored hour
+    _, query = owlracle_stub.requests[-1]
+    assert (query['from'], query['to'], query['candles'], query['timeframe']) == ('1546387200', '1546473600', '24', '1h')
+    assert df.schema == stored.schema
+    assert df['date'][-1] == datetime(2019, 1, 2) and df['transaction_fees'][-1] == 17898.0
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+from rfa_utils import general_fns as gf
+from rfa_utils.panel import Panel
+
+
+@pytest.fixture
+def dfs():
+    dates = pd.date_range('2019-01-01', periods=4, freq='D', name='date')
+    return {
+        'btc': pd.DataFrame({'fees': [1.0, 2.0, 3.0, 4.0], 'volume': [10.0, 20.0, 30.0, 40.0]}, index=dates),
+        # Polars, one day later and without volume
+        'xmr': pl.DataFrame({'date': dates[1:].date.tolist() + [pd.Timestamp('2019-01-05').date()], 'fees': [5.0, 6.0, None, 8.0]})
+    }
+
+
+def test_from_dict_aligns_dates(dfs):
+    panel = Panel.from_dict(dfs)
+    assert panel.metrics == ['fees', 'volume'] and panel.symbols == ['btc', 'xmr']
+    assert list(panel.dates) == list(pd.date_range('2019-01-01', periods=5, freq='D'))
+    assert panel.present.tolist() == [[True, True], [True, False]]
+    np.testing.assert_array_equal(panel.array('fees'), [[1, 2, 3, 4, np.nan], [np.nan, 5, 6, np.nan, 8]])
+    assert list(panel['xmr'].columns) == ['fees']
+    assert panel.metric('volume').columns.tolist() == ['btc']
+
+
+def test_from_store(dfs, tmp_path):
+    path = str(tmp_path / 'data.xlsx')
+    gf.create_store(path, {name: pl.from_pandas(df.reset_index()) if isinstance(df, pd.DataFrame) else df for name, df in dfs.items()})
+    panel = Panel.from_store(path, ['btc', 'xmr'], metrics=['fees'], dtype=np.float32)
+    expected = Panel.from_dict(dfs, metrics=['fees'])
+    assert panel.values.dtype == np.float32
+    np.testing.assert_array_equal(panel.values, expected.values.astype(np.float32))
+    assert panel.dates.equals(expected.dates)
+
+
+def test_getitem_is_read_only(dfs):
+    panel = Panel.from_dict(dfs)
+    btc = panel['btc']
+    # Every metric, a view on the array
+    assert np.shares_memory(btc.to_numpy(), panel.values)
+    # A missing metric, a copy that is just as read-only
+    xmr = panel['xmr']
+    assert not np.shares_memory(xmr.to_numpy(), panel.values)
+    for df in (btc, xmr):
+        with pytest.raises(ValueError):
+            df.iloc[1, 0] = -1.0
+    btc['fee_percentage'] = 1.0
+    assert 'fee_percentage' not in panel.metrics
+    assert panel.array('fees')[0, 1] == 2.0 and panel.array('fees')[1, 1] == 5.0
+
+
+def test_select_and_assign(dfs):
+    panel = Panel.from_dict(dfs)
+    xmr = panel.select(['xmr'])
+    assert xmr.symbols == ['xmr'] and xmr.present.tolist() == [[True], [False]]
+    np.testing.assert_array_equal(xmr['xmr']['fees'], panel['xmr']['fees'])
+
+    # A new metric returns a new panel
+    ratio = panel.assign('ratio', panel.array('fees') / panel.array('volume'), np.array([True, False]))
+    assert ratio.metrics == ['fees', 'volume', 'ratio'] and 'ratio' not in panel.metrics
+    assert list(ratio['btc'].columns) == ['fees', 'volume', 'ratio'] and list(ratio['xmr'].columns) == ['fees']
+    np.testing.assert_allclose(ratio['btc']['ratio'].iloc[:4], 0.1)
+    # An existing metric is overwritten in place
+    assert panel.assign('fees', np.zeros((2, 5))) is panel
+    assert (panel.array('fees') == 0).all()
+
+
+def test_to_long(dfs):
+    long = Panel.from_dict(dfs).to_long()
+    assert long.columns == ['symbol', 'date', 'fees', 'volume']
+    assert long.schema['symbol'] == pl.Categorical and long.schema['date'] == pl.Date
+    assert long.height == 10
+    xmr = long.filter(pl.col('symbol') == 'xmr')
+    # Missing days and metrics are nulls rather than NaN
+    assert xmr['fees'].to_list() == [None, 5.0, 6.0, None, 8.0]
+    assert xmr['volume'].null_count() == 5
@@ -0,0 +1,30 @@
+import os
+import numpy as np
+import pytest
+from rfa_utils import general_fns as gf
+from rfa_utils import remittance_cube as rc
+from rfa_eda import remittance_eda as reda
+
+WORKBOOK = os.path.join('data', 'remittance', 'remittance-data.xlsx')
+
+
+@pytest.fixture(scope='module')
+def remit():
+    if not os.path.exists(WORKBOOK):
+        pytest.skip('remittance workbook not available')
+    return gf.import_excel(WORKBOOK, ['country-lookup', *rc.DATASETS.values()])
+
+
+@pytest.mark.parametrize('group', ['Income', 'Region'])
+@pytest.mark.parametrize('dataset', list(rc.DATASETS))
+def test_cube_pivot_matches_pivot_table(remit, dataset, group):
+    facts = rc.build_facts(remit)
+    cube = {'facts': facts, 'aggregates': rc.build_aggregates(facts)}
+    expected = reda.pivot_table(reda.merge_lookup(remit[rc.DATASETS[dataset]].to_pandas(), remit['country-lookup'].to_pandas()), group)
+    expected.index = expected.index.astype(int)
+    result = rc.cube_pivot(cube, dataset, group)
+    # Years and groups without any observation are all NaN in the cube and left out of the pivot table
+    result = result.dropna(how='all').dropna(axis=1, how='all')
+    assert list(result.index) == list(expected.index)
+    assert sorted(result.columns) == sorted(expected.columns)
+    np.testing.assert_allclose(result[expected.columns].to_numpy(), expected.to_numpy(dtype=float))
@@ -0,0 +1,60 @@
+import os
+import json
+import pandas as pd
+from rfa_eda import report
+
+
+def pivot(scale: float = 1.0) -> pd.DataFrame:
+    df = pd.DataFrame({'High income': [5.0, 4.5], 'Low income': [9.0, 8.5]}, index=pd.Index([2019, 2020], name='Year'))
+    return df * scale
+
+
+def test_job_hash_follows_data_and_function():
+    job = report.FigureJob('cost', report.lineplot_figure, (pivot(), 'Cost To (by Income)'))
+    assert report.job_hash(job) == report.job_hash(job._replace(name='other'))
+    assert report.job_hash(job) != report.job_hash(job._replace(args=(pivot(2.0), 'Cost To (by Income)')))
+    assert report.job_hash(job) != report.job_hash(job._replace(fn=report.render_job))
+
+
+def test_render_report_skips_unchanged_jobs(tmp_path):
+    out_dir = str(tmp_path)
+    jobs = [
+        report.FigureJob('income', report.lineplot_figure, (pivot(), 'Cost To (by Income)')),
+        report.FigureJob('region', report.lineplot_figure, (pivot(), 'Cost To (by Region)'))
+    ]
+    report.render_report(jobs, out_dir, workers=2)
+    paths = {job.name: os.path.join(out_dir, f'{job.name}.png') for job in jobs}
+    with open(os.path.join(out_dir, report.MANIFEST)) as f:
+        manifest = json.load(f)
+    assert manifest['income']['paths'] == [paths['income']]
+
+    # Only the job whose data changed is rendered again
+    os.utime(paths['income'], (0, 0))
+    os.utime(paths['region'], (0, 0))
+    jobs[1] = jobs[1]._replace(args=(pivot(2.0), 'Cost To (by Region)'))
+    report.render_report(jobs, out_dir, workers=2)
+    assert os.path.getmtime(paths['income']) == 0
+    assert os.path.getmtime(paths['region']) > 0
+
+    # Missing files and new formats are rendered again
+    os.remove(paths['income'])
+    report.render_report(jobs, out_dir, formats=('png', 'svg'), workers=2)
+    assert all(os.path.exists(os.path.join(out_dir, f'{name}.{fmt}')) for name in paths for fmt in ('png', 'svg'))
+
+
+def test_write_report_links_first_format(tmp_path):
+    out_dir = str(tmp_path)
+    entries = {
+        'income': [os.path.join(out_dir, 'income.png'), os.path.join(out_dir, 'income.svg')],
+        'fees': [os.path.join(out_dir, 'fees-1.png'), os.path.join(out_dir, 'fees-2.png')]
+    }
+    html_path = report.write_report(out_dir, entries, 'Nightly')
+    assert html_path == os.path.join(out_dir, 'report.html')
+    with open(os.path.join(out_dir, 'report.md')) as f:
+        md = f.read()
+    assert md.startswith('# Nightly')
+    assert '![income](income.png)' in md and 'income.svg' not in md
+    assert '![fees](fees-1.png)' in md and '![fees](fees-2.png)' in md
+    with open(html_path) as f:
+        html = f.read()
+    assert '<h2>income</h2>' in html and '<img src="fees-2.png"' in html
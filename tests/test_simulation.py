@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+from rfa_ana import simulation as sim
+
+
+@pytest.fixture(scope='module')
+def methods():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2019-01-01', '2020-12-31', freq='D', name='date')
+    crypto = {
+        # A flat $2 fee on $50 transfers
+        'flat': pd.DataFrame({'average_transaction_fees': 2.0, 'average_transaction_value': 50.0}, index=dates),
+        # Only observed in 2019
+        'old': pd.DataFrame({'average_transaction_fees': rng.lognormal(size=365), 'average_transaction_value': 100.0},
+                            index=dates[:365])
+    }
+    gas_fees = pd.DataFrame({'transaction_fees': rng.uniform(1, 3, len(dates))}, index=dates)
+    cube = {'facts': pl.DataFrame({'year': [2019] * 3 + [2020] * 3, 'cost_to': [5.0, 6.0, 7.0, 4.0, 5.0, 6.0]})}
+    return sim.cost_methods(crypto, gas_fees, cube)
+
+
+def test_same_seed_for_any_workers_and_chunks(methods):
+    kwargs = dict(years=[2019, 2020], draws=3 * sim.SEED_BLOCK + 10)
+    expected = sim.simulate_costs(methods, **kwargs)
+    for workers, chunk_size in [(1, 1), (2, sim.SEED_BLOCK), (3, 2 * sim.SEED_BLOCK), (2, 10 * sim.SEED_BLOCK)]:
+        pd.testing.assert_frame_equal(sim.simulate_costs(methods, workers=workers, chunk_size=chunk_size, **kwargs), expected)
+    assert not sim.simulate_costs(methods, seed=1, **kwargs).equals(expected)
+
+
+def test_cost_distributions(methods):
+    bands = sim.simulate_costs(methods, [2019, 2020, 2021], draws=200_000)
+    # A flat fee over the five amounts, each drawn a fifth of the time
+    flat = bands.loc[('flat', 2019)]
+    pct = sorted(2 / np.array(sim.AMOUNTS) * 100)
+    assert (flat['p5'], flat['p50'], flat['p95']) == pytest.approx((pct[0], pct[2], pct[-1]))
+    assert flat['mean'] == pytest.approx(np.mean(pct), rel=0.01)
+    # Gas fees of $1 to $3 drawn independently of the amount
+    stablecoin = bands.loc[('Stablecoin', 2020)]
+    assert stablecoin['mean'] == pytest.approx(2 * np.mean(100 / np.array(sim.AMOUNTS)), rel=0.02)
+    assert stablecoin['p50'] == pytest.approx(2 / 200 * 100, abs=0.05)
+    # Corridor costs are sampled as they are
+    assert bands.loc[('Remittance', 2019), ['p5', 'p50', 'p95']].tolist() == [5.0, 6.0, 7.0]
+    assert bands.loc[('Remittance', 2020), 'mean'] == pytest.approx(5.0, abs=0.01)
+    assert bands.loc[('flat', 2020), 'p50_vs_remittance'] == pytest.approx(pct[2] / 5.0)
+    # Bands are ordered, and years without observations are NaN
+    values = bands[[f'p{p}' for p in sim.PERCENTILES]].dropna()
+    assert (np.diff(values.to_numpy(), axis=1) >= 0).all()
+    assert bands.loc[('old', 2020)].isna().all() and bands.loc[(slice(None), 2021), :].isna().all().all()
+
+
+def test_priced_at_transaction_value(methods):
+    bands = sim.simulate_costs(methods, [2019], draws=1_000, use_values=True)
+    assert bands.loc[('flat', 2019), ['p5', 'p95']].tolist() == pytest.approx([4.0, 4.0])
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+from rfa_utils import wb_ingest as wb
+
+SOURCES = {os.path.join(wb.REMITTANCE_DIR, name): indicator for name, indicator in wb.SOURCES.items()}
+
+pytestmark = pytest.mark.skipif(not all(os.path.exists(path) for path in SOURCES), reason='World Bank sources not available')
+
+
+@pytest.fixture(scope='module')
+def long_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('wb') / 'long.parquet')
+    rows = wb.ingest(path, batch_size=10_000)
+    assert rows == pl.scan_parquet(path).select(pl.count()).collect().item()
+    return path
+
+
+def test_indicators_are_named(long_path):
+    # Every sheet has an Indicator Code column, its codes are stored under the source names
+    indicators = pl.read_parquet(long_path)['indicator'].cast(pl.Utf8).unique().sort().to_list()
+    assert indicators == sorted(wb.SOURCES.values())
+
+
+@pytest.mark.parametrize('path, indicator', list(SOURCES.items()))
+def test_indicator_table_matches_sheet(long_path, path, indicator):
+    sheet = pd.read_excel(path, skiprows=3)
+    assert wb.INDICATORS[sheet['Indicator Code'].iloc[0]] == indicator
+    years = [c for c in sheet.columns if str(c).isdigit()]
+    expected = sheet.set_index('Country Code')[years].dropna(how='all')
+    expected.columns = expected.columns.astype(int)
+
+    table = wb.indicator_table(long_path, indicator).to_pandas().set_index('Country Code')
+    table.columns = table.columns.astype(int)
+    # Years and countries without any value are not in the long table
+    expected = expected.loc[table.index, table.columns]
+    assert set(table.index) == set(sheet.set_index('Country Code')[years].dropna(how='all').index)
+    np.testing.assert_allclose(table.to_numpy(), expected.to_numpy(dtype=float))